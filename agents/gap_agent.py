@@ -1,15 +1,10 @@
 import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
+from utils.llm import complete_answer
+from utils.prompt_packing import GAP_PROMPT_TOKEN_BUDGET, fit_to_budget, pack_syntheses
 
-load_dotenv()
 
-groq_api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=groq_api_key)
-
-
-def detect_gaps(synthesis_results_path):
+def detect_gaps(synthesis_results_path, token_budget=GAP_PROMPT_TOKEN_BUDGET):
 
     gap_system_prompt = """
 You are a research gap detection agent.
@@ -57,25 +52,17 @@ Return ONLY this structure inside <answer> tags:
     with open(synthesis_results_path, "r") as f:
         synthesized_data = json.load(f)
 
-    completion = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {"role": "system", "content": gap_system_prompt},
-            {"role": "user", "content": json.dumps(synthesized_data, indent=2)}
-        ],
-        stream=False
-    )
-
-    reply = completion.choices[0].message.content
-
-    start = reply.find("<answer>") + len("<answer>")
-    end = reply.find("</answer>")
-    json_text = reply[start:end].strip()
+    messages = [
+        {"role": "system", "content": gap_system_prompt},
+        {"role": "user", "content": fit_to_budget(pack_syntheses(synthesized_data), token_budget)}
+    ]
 
     try:
-        gap_results = json.loads(json_text)
-    except json.JSONDecodeError:
-        gap_results = {"error": "parse_failed", "raw": json_text}
+        gap_results = complete_answer(messages, agent="gap_agent")
+    except json.JSONDecodeError as e:
+        gap_results = {"error": "parse_failed", "raw": e.doc}
+    except ValueError:
+        gap_results = {"error": "parse_failed", "raw": ""}
 
     output_folder = os.path.dirname(synthesis_results_path)
     output_path = os.path.join(output_folder, "gap_results.json")
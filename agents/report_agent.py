@@ -1,16 +1,172 @@
 import os
 import json
-import re
-from groq import Groq
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import env, env_flag
+from utils.llm import complete_answer
+from utils.prompt_packing import REPORT_PROMPT_TOKEN_BUDGET, fit_to_budget, pack_gaps, pack_syntheses
+from utils.tracing import in_context, span
 
-load_dotenv()
+# Draft each research section in its own call, then write the summary fields in one short call
+REPORT_MAP_REDUCE = env_flag("REPORT_MAP_REDUCE", True)
+REPORT_MAX_WORKERS = int(env("REPORT_MAX_WORKERS", "4"))
+REPORT_SECTION_TOKEN_BUDGET = int(env("REPORT_SECTION_TOKEN_BUDGET", "1500"))
 
-groq_api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=groq_api_key)
+section_system_prompt = """
+You are a research report generation agent writing ONE section of a research report.
 
+You are given the synthesized findings for a single research task.
 
-def generate_report(synthesis_results_path, gap_results_path):
+Your job:
+
+- Summarize what the evidence says about this task.
+- List the key findings.
+- Do NOT invent new information.
+- Stay grounded strictly in provided data.
+
+STRICT RULES:
+- Output MUST be valid JSON.
+- Use double quotes for all property names.
+- No trailing commas.
+- No explanation outside <answer> block.
+
+Return ONLY this structure inside <answer> tags:
+
+<answer>
+{
+  "summary": "",
+  "key_findings": []
+}
+</answer>
+"""
+
+reduce_system_prompt = """
+You are a research report generation agent.
+
+You are given:
+1. The drafted sections of a research report, one per task.
+2. Gap analysis results.
+
+Your job:
+
+- Write an executive summary of the whole report.
+- Assess the overall strengths and limitations of the research.
+- Provide clear recommendations that address the gaps.
+- Do NOT invent new information.
+- Stay grounded strictly in provided data.
+
+STRICT RULES:
+- Output MUST be valid JSON.
+- Use double quotes for all property names.
+- No trailing commas.
+- No explanation outside <answer> block.
+
+Return ONLY this structure inside <answer> tags:
+
+<answer>
+{
+  "executive_summary": "",
+  "overall_assessment": {
+    "strengths": [],
+    "limitations": []
+  },
+  "recommended_next_steps": []
+}
+</answer>
+"""
+
+
+def fallback_section(task_description, synthesis):
+    # Built straight from the synthesis when drafting fails, so no task drops out of the report
+    if not isinstance(synthesis, dict) or "error" in synthesis:
+        return {"task": task_description, "summary": "Synthesis failed for this task.", "key_findings": []}
+
+    return {
+        "task": task_description,
+        "summary": synthesis.get("synthesized_summary", ""),
+        "key_findings": synthesis.get("strongly_supported_points") or synthesis.get("core_concepts") or []
+    }
+
+
+def draft_section(task_description, synthesis, token_budget=REPORT_SECTION_TOKEN_BUDGET):
+    if not isinstance(synthesis, dict) or "error" in synthesis:
+        return fallback_section(task_description, synthesis)
+
+    messages = [
+        {"role": "system", "content": section_system_prompt},
+        {"role": "user", "content": fit_to_budget(pack_syntheses({task_description: synthesis}), token_budget)}
+    ]
+
+    with span("draft_section", kind="task", task=task_description):
+        try:
+            section = complete_answer(messages, agent="report_agent")
+        except ValueError:
+            section = None
+
+    if not isinstance(section, dict) or not isinstance(section.get("summary"), str):
+        print(f"Section draft failed for task '{task_description}', using its synthesis")
+        return fallback_section(task_description, synthesis)
+
+    key_findings = section.get("key_findings")
+    return {
+        "task": task_description,
+        "summary": section["summary"],
+        "key_findings": key_findings if isinstance(key_findings, list) else []
+    }
+
+
+def reduce_report(sections, gap_data, token_budget=REPORT_PROMPT_TOKEN_BUDGET):
+    combined_input = {
+        "research_sections": sections,
+        "gap_analysis": pack_gaps(gap_data)
+    }
+
+    messages = [
+        {"role": "system", "content": reduce_system_prompt},
+        {"role": "user", "content": fit_to_budget(combined_input, token_budget)}
+    ]
+
+    try:
+        summary = complete_answer(messages, agent="report_agent")
+    except ValueError:
+        summary = None
+
+    if not isinstance(summary, dict):
+        print("Report summary failed, keeping the drafted sections")
+        summary = {}
+
+    assessment = summary.get("overall_assessment")
+    if not isinstance(assessment, dict):
+        assessment = {}
+
+    return {
+        "executive_summary": summary.get("executive_summary", ""),
+        "research_sections": sections,
+        "overall_assessment": {
+            "strengths": assessment.get("strengths", []),
+            "limitations": assessment.get("limitations", [])
+        },
+        "identified_gaps": gap_data.get("global_gaps", []) if isinstance(gap_data, dict) else [],
+        "recommended_next_steps": summary.get("recommended_next_steps", [])
+    }
+
+
+def map_reduce_report(synthesized_data, gap_data, token_budget=REPORT_PROMPT_TOKEN_BUDGET, max_workers=REPORT_MAX_WORKERS):
+    task_items = list(synthesized_data.items())
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # Each submit gets its own copy of this thread's context so the section spans join the run's trace
+        futures = [
+            executor.submit(in_context(draft_section), task_description, synthesis)
+            for task_description, synthesis in task_items
+        ]
+        sections = [future.result() for future in futures]
+
+    return reduce_report(sections, gap_data, token_budget)
+
+
+def generate_report(synthesis_results_path, gap_results_path, token_budget=REPORT_PROMPT_TOKEN_BUDGET, map_reduce=None):
+    if map_reduce is None:
+        map_reduce = REPORT_MAP_REDUCE
 
     report_system_prompt = """
 You are a research report generation agent.
@@ -62,33 +218,25 @@ Return ONLY this structure inside <answer> tags:
     with open(gap_results_path, "r") as f:
         gap_data = json.load(f)
 
-    combined_input = {
-        "synthesized_results": synthesized_data,
-        "gap_analysis": gap_data
-    }
+    if map_reduce and synthesized_data:
+        report_results = map_reduce_report(synthesized_data, gap_data, token_budget)
+    else:
+        combined_input = {
+            "synthesized_results": pack_syntheses(synthesized_data),
+            "gap_analysis": pack_gaps(gap_data)
+        }
 
-    completion = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
+        messages = [
             {"role": "system", "content": report_system_prompt},
-            {"role": "user", "content": json.dumps(combined_input, indent=2)}
-        ],
-        stream=False
-    )
-
-    reply = completion.choices[0].message.content
-
-    match = re.search(r"<answer>(.*?)</answer>", reply, re.DOTALL)
-
-    if not match:
-        raise ValueError("No structured report returned")
-
-    json_text = match.group(1).strip()
-
-    try:
-        report_results = json.loads(json_text)
-    except json.JSONDecodeError:
-        report_results = {"error": "parse_failed", "raw": json_text}
+            {"role": "user", "content": fit_to_budget(combined_input, token_budget)}
+        ]
+
+        try:
+            report_results = complete_answer(messages, agent="report_agent")
+        except json.JSONDecodeError as e:
+            report_results = {"error": "parse_failed", "raw": e.doc}
+        except ValueError:
+            raise ValueError("No structured report returned")
 
     output_folder = os.path.dirname(synthesis_results_path)
     output_path = os.path.join(output_folder, "final_report.json")
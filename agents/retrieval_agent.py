@@ -1,50 +1,79 @@
-from groq import Groq
-from dotenv import load_dotenv
 import os
 import json
-from tavily import TavilyClient
+import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from utils import http_pool
+from utils.config import env, env_flag
+from utils.load_json import load_json
+from utils.disk_cache import CACHE_DIR, DiskCache, make_cache_key
+from utils.llm import complete_answer
+from utils.metrics import CACHE_REQUESTS
+from utils.passage_ranker import (
+    PASSAGE_MAX_CHARS, RETRIEVAL_TASK_TOKEN_BUDGET, SNIPPET_CHARS, choose_passages, join_passages, split_passages
+)
+from utils.prompt_packing import compact_json
+from utils.scheduler import PRIORITY_BACKGROUND, scheduler
+from utils.search_client import TavilySearch
+from utils.tracing import in_context, span
 
-load_dotenv()
 
-groq_api_key = os.getenv("GROQ_API_KEY")
-search_api_key = os.getenv("TAVILY_SEARCH_API")
+search_api_key = env("TAVILY_SEARCH_API")
 
-client = Groq(api_key=groq_api_key)
-tavily = TavilyClient(api_key=search_api_key)
+tavily = TavilySearch(api_key=search_api_key)
 
+RETRIEVAL_MAX_WORKERS = int(env("RETRIEVAL_MAX_WORKERS", "4"))
+RETRIEVAL_TASK_TIMEOUT = float(env("RETRIEVAL_TASK_TIMEOUT", "60"))
 
-def fetch_search_results(query):
-    response = tavily.search(
-        query=query,
-        search_depth="advanced",
-        max_results=5
-    )
+# Collapse search hits shared by several tasks so each page is extracted once
+DEDUPE_SOURCES = env_flag("RETRIEVAL_DEDUPE_SOURCES", True)
+EXTRACTION_BATCH_SIZE = int(env("RETRIEVAL_EXTRACTION_BATCH_SIZE", "5"))
 
-    structured_results = []
+SEARCH_DEPTH = "advanced"
+SEARCH_MAX_RESULTS = 5
+SEARCH_CACHE_TTL = float(env("SEARCH_CACHE_TTL", str(24 * 60 * 60)))
+SEARCH_CACHE_MAX_ENTRIES = int(env("SEARCH_CACHE_MAX_ENTRIES", "5000"))
 
-    for result in response["results"]:
-        structured_results.append({
-            "title": result["title"],
-            "url": result["url"],
-            "snippet": result["content"][:1200]
-        })
+search_cache = DiskCache(
+    env("SEARCH_CACHE_PATH", os.path.join(CACHE_DIR, "search_cache.sqlite")),
+    ttl=SEARCH_CACHE_TTL,
+    max_entries=SEARCH_CACHE_MAX_ENTRIES
+)
 
-    return structured_results
+retriever_system_prompt_template = """You are a research retrieval agent. Your job: Extract accurate facts from the provided search results for the following task:
+Task: {task_description}
+Rules:
+- Use ONLY the given search results
+- Do NOT invent information
+- Keep summaries concise and factual
+- Include the source URL for every item
+- If results are insufficient, return an empty list
 
+IMPORTANT: Your response must contain ONLY the <answer> block below. No extra text, no explanation, no preamble.
 
-def retrieve(tasks_file_path):
+<answer>
+[
+  {{
+    "source": "...",
+    "title": "...",
+    "summary": "...",
+    "key_points": ["...", "..."]
+  }}
+]
+</answer>
 
-    with open(tasks_file_path, "r") as f:
-        tasks = json.load(f)
+Do not write anything before or after the <answer> tags."""
 
-    retriever_system_prompt_template = """You are a research retrieval agent. Your job: Extract accurate facts from the provided search results for the following task:
-Task: {task_description}
+shared_sources_system_prompt = """You are a research retrieval agent. Your job: Extract accurate facts from the provided search results for the following research tasks:
+{task_list}
+Each search result lists the tasks it was found for. Extract the facts relevant to those tasks.
 Rules:
 - Use ONLY the given search results
 - Do NOT invent information
 - Keep summaries concise and factual
-- Include the source URL for every item
-- If results are insufficient, return an empty list
+- Return one item per search result that contains relevant facts
+- "source" MUST be the exact "url" of the search result the item comes from
 
 IMPORTANT: Your response must contain ONLY the <answer> block below. No extra text, no explanation, no preamble.
 
@@ -61,54 +90,298 @@ IMPORTANT: Your response must contain ONLY the <answer> block below. No extra te
 
 Do not write anything before or after the <answer> tags."""
 
-    all_results = {}
 
-    for task in tasks:
-        task_description = task["description"]
+def normalize_query(query):
+    query = re.sub(r"[^a-z0-9\s]+", " ", query.lower())
+    return re.sub(r"\s+", " ", query).strip()
 
-        formatted_prompt = retriever_system_prompt_template.format(
-            task_description=task_description
-        )
 
-        search_results = fetch_search_results(task_description)
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[len("www."):]
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query)
+        if not key.lower().startswith("utm_")
+    ])
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
 
-        messages = [
-            {"role": "system", "content": formatted_prompt},
-            {
-                "role": "user",
-                "content": "Here are the search results:\n\n" +
-                           json.dumps(search_results, indent=2)
-            }
-        ]
 
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=messages,
-            stream=False
+def content_hash(text):
+    normalized = re.sub(r"\s+", " ", text.lower()).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def search(query, timeout=RETRIEVAL_TASK_TIMEOUT):
+    with span("tavily.search", query=query) as attrs:
+        cache_key = make_cache_key(normalize_query(query), SEARCH_DEPTH, SEARCH_MAX_RESULTS)
+
+        cached = search_cache.get(cache_key)
+        attrs["cached"] = cached is not None
+        CACHE_REQUESTS.inc(cache="search", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+        response = scheduler.call(
+            "tavily",
+            lambda: tavily.search(
+                query=query,
+                search_depth=SEARCH_DEPTH,
+                max_results=SEARCH_MAX_RESULTS,
+                timeout=int(timeout)
+            ),
+            priority=PRIORITY_BACKGROUND,
+            retry_on=http_pool.transport_errors()
         )
 
-        reply = completion.choices[0].message.content
+        results = response["results"]
+        search_cache.set(cache_key, results)
+
+        return results
+
 
-        start = reply.find("<answer>") + len("<answer>")
-        end = reply.find("</answer>")
+def fetch_search_results(query, timeout=RETRIEVAL_TASK_TIMEOUT):
+    results = search(query, timeout=timeout)
 
-        if start == -1 or end == -1:
-            print(f"Missing <answer> tags for task '{task_description}'")
-            all_results[task_description] = []
-            continue
+    # The full page text is kept until the sources are grouped; add_snippets then cuts it down
+    return [
+        {"title": result["title"], "url": result["url"], "content": result.get("content") or ""}
+        for result in results
+    ]
 
-        json_text = reply[start:end].strip()
 
+def safe_fetch_search_results(task_description, timeout=RETRIEVAL_TASK_TIMEOUT):
+    # One slow or failing search must not take the rest of the batch down with it
+    with span("search_task", kind="task", task=task_description):
         try:
-            task_results = json.loads(json_text)
+            return fetch_search_results(task_description, timeout=timeout)
+        except Exception as e:
+            print(f"Search failed for task '{task_description}': {e}")
+            return []
+
+
+def group_sources(task_hits, dedupe=True):
+    # Returns the unique sources, per task the indexes of the sources it found,
+    # and every normalized URL (including merged duplicates) mapped to the sources it belongs to
+    sources = []
+    task_sources = {}
+    url_index = {}
+    seen = {}
+
+    for task_description, hits in task_hits.items():
+        task_sources[task_description] = []
+
+        for hit in hits:
+            keys = [("url", normalize_url(hit["url"]))]
+            if hit["content"].strip():
+                keys.append(("content", content_hash(hit["content"])))
+            index = next((seen[key] for key in keys if key in seen), None) if dedupe else None
+
+            if index is None:
+                index = len(sources)
+                sources.append({**hit, "tasks": []})
+
+            for key in keys:
+                seen.setdefault(key, index)
+            if index not in url_index.setdefault(keys[0][1], []):
+                url_index[keys[0][1]].append(index)
+
+            if task_description not in sources[index]["tasks"]:
+                sources[index]["tasks"].append(task_description)
+            if index not in task_sources[task_description]:
+                task_sources[task_description].append(index)
+
+    return sources, task_sources, url_index
+
+
+def add_snippets(sources, task_sources, token_budget=RETRIEVAL_TASK_TOKEN_BUDGET):
+    # Only the passages that best match a task go into its extraction prompt. Each task
+    # ranks the passages of the sources it found; a source shared by several tasks
+    # gets the union of the passages each of them picked.
+    if token_budget <= 0:
+        for source in sources:
+            source["snippet"] = source.pop("content")[:SNIPPET_CHARS]
+        return sources
+
+    split = [split_passages(source.pop("content"), PASSAGE_MAX_CHARS) for source in sources]
+    chosen = [set() for _ in sources]
+
+    for task_description, indexes in task_sources.items():
+        picks = choose_passages(task_description, [split[index] for index in indexes], token_budget)
+        for index, positions in zip(indexes, picks):
+            chosen[index].update(positions)
+
+    for source, passages, positions in zip(sources, split, chosen):
+        source["snippet"] = join_passages(passages, positions)
+
+    return sources
+
+
+def batch_sources(sources, task_sources, batch_size=EXTRACTION_BATCH_SIZE, per_task=False):
+    # Walk tasks in order so a task's sources land in as few batches as possible.
+    # per_task keeps every batch to one task's sources.
+    batches = []
+    assigned = set()
+    current = []
+
+    for indexes in task_sources.values():
+        if per_task and current:
+            batches.append(current)
+            current = []
+
+        for index in indexes:
+            if index in assigned:
+                continue
+            assigned.add(index)
+            current.append(index)
+
+            if len(current) >= batch_size:
+                batches.append(current)
+                current = []
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def extract_batch(sources, timeout=RETRIEVAL_TASK_TIMEOUT):
+    task_descriptions = []
+    for source in sources:
+        for task_description in source["tasks"]:
+            if task_description not in task_descriptions:
+                task_descriptions.append(task_description)
+
+    if len(task_descriptions) == 1:
+        formatted_prompt = retriever_system_prompt_template.format(
+            task_description=task_descriptions[0]
+        )
+        search_results = [
+            {"title": s["title"], "url": s["url"], "snippet": s["snippet"]}
+            for s in sources
+        ]
+    else:
+        formatted_prompt = shared_sources_system_prompt.format(
+            task_list="\n".join(f"- {d}" for d in task_descriptions)
+        )
+        search_results = sources
+
+    messages = [
+        {"role": "system", "content": formatted_prompt},
+        {
+            "role": "user",
+            "content": "Here are the search results:\n\n" + compact_json(search_results)
+        }
+    ]
+
+    label = task_descriptions[0] if len(task_descriptions) == 1 else f"{len(task_descriptions)} tasks"
+
+    with span("extract_batch", kind="task", tasks=label, sources=len(sources)):
+        try:
+            items = complete_answer(messages, agent="retrieval_agent", timeout=timeout)
         except json.JSONDecodeError as e:
-            print(f"Parse failed for task '{task_description}': {e}")
-            print("Raw output:", json_text)
-            task_results = []
+            print(f"Parse failed for task '{label}': {e}")
+            print("Raw output:", e.doc)
+            return []
+        except ValueError:
+            print(f"Missing <answer> tags for task '{label}'")
+            return []
 
-        all_results[task_description] = task_results
+    return items if isinstance(items, list) else []
 
-    base_folder = os.path.dirname(tasks_file_path)
+
+def retrieve_tasks(task_descriptions, max_workers=RETRIEVAL_MAX_WORKERS, timeout=RETRIEVAL_TASK_TIMEOUT,
+                   dedupe=None, on_task_done=None):
+    # Searches every task first, extracts each unique source once and fans the
+    # extracted items back out to every task that found that source.
+    # on_task_done(task_description, items) fires as soon as all of a task's
+    # sources have been extracted, so callers can start downstream work early.
+    task_descriptions = list(dict.fromkeys(task_descriptions))
+    if dedupe is None:
+        dedupe = DEDUPE_SOURCES
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        search_futures = [
+            executor.submit(in_context(safe_fetch_search_results), task_description, timeout)
+            for task_description in task_descriptions
+        ]
+        task_hits = {
+            task_description: future.result()
+            for task_description, future in zip(task_descriptions, search_futures)
+        }
+
+        sources, task_sources, url_index = group_sources(task_hits, dedupe=dedupe)
+        add_snippets(sources, task_sources)
+        # Without dedupe every task extracts its own copy of a shared page, so batches must not mix tasks
+        batches = batch_sources(sources, task_sources, per_task=not dedupe)
+
+        total_hits = sum(len(hits) for hits in task_hits.values())
+        if total_hits > len(sources):
+            print(f"Deduplicated {total_hits} search hits to {len(sources)} unique sources")
+
+        source_batch = {index: b for b, batch in enumerate(batches) for index in batch}
+        pending_batches = {
+            task_description: {source_batch[index] for index in indexes}
+            for task_description, indexes in task_sources.items()
+        }
+        extracted = {}
+        results = {}
+
+        def finish(task_description):
+            items = []
+            for index in task_sources[task_description]:
+                for item in extracted.get(index, []):
+                    if item not in items:
+                        items.append(item)
+            results[task_description] = items
+            if on_task_done:
+                on_task_done(task_description, items)
+
+        for task_description, remaining in pending_batches.items():
+            if not remaining:
+                finish(task_description)
+
+        batch_futures = {
+            executor.submit(in_context(extract_batch), [sources[index] for index in batch], timeout): b
+            for b, batch in enumerate(batches)
+        }
+
+        for future in as_completed(batch_futures):
+            b = batch_futures[future]
+            batch = batches[b]
+
+            try:
+                items = future.result()
+            except Exception as e:
+                print(f"Extraction failed for {len(batch)} source(s): {e}")
+                items = []
+
+            single_task = len({t for index in batch for t in sources[index]["tasks"]}) == 1
+
+            for item in items:
+                # Only this batch's sources can have produced the item; without dedupe
+                # other tasks have their own source for the same URL
+                url = normalize_url(str(item.get("source", "")))
+                index = next((index for index in url_index.get(url, []) if index in batch), None)
+                if index is None:
+                    if not single_task:
+                        continue
+                    # A single-task batch keeps items whose source the model rewrote
+                    index = batch[0]
+                extracted.setdefault(index, []).append(item)
+
+            for task_description, remaining in pending_batches.items():
+                if b in remaining:
+                    remaining.discard(b)
+                    if not remaining:
+                        finish(task_description)
+
+    # Return in the order the tasks were given
+    return {task_description: results[task_description] for task_description in task_descriptions}
+
+
+def save_retrieval_results(all_results, base_folder):
     output_path = os.path.join(base_folder, "retrieval_results.json")
 
     with open(output_path, "w") as f:
@@ -116,4 +389,35 @@ Do not write anything before or after the <answer> tags."""
 
     print("Saved to:", output_path)
 
-    return output_path
\ No newline at end of file
+    return output_path
+
+
+def retrieve(tasks_file_path, max_workers=RETRIEVAL_MAX_WORKERS, timeout=RETRIEVAL_TASK_TIMEOUT, incremental=False,
+             on_task_done=None):
+
+    with open(tasks_file_path, "r") as f:
+        tasks = json.load(f)
+
+    base_folder = os.path.dirname(tasks_file_path)
+    task_descriptions = [task["description"] for task in tasks]
+
+    # In incremental mode tasks already retrieved earlier in this run are carried over
+    existing_results = {}
+    if incremental:
+        existing_results = load_json(os.path.join(base_folder, "retrieval_results.json"), {})
+
+    pending = [d for d in task_descriptions if d not in existing_results]
+    if incremental:
+        print(f"Retrieving {len(pending)} new task(s), reusing {len(task_descriptions) - len(pending)}")
+
+    new_results = retrieve_tasks(pending, max_workers=max_workers, timeout=timeout, on_task_done=on_task_done)
+
+    # Collect in tasks.json order so retrieval_results.json stays deterministic
+    all_results = {}
+    for task_description in task_descriptions:
+        if task_description in new_results:
+            all_results[task_description] = new_results[task_description]
+        else:
+            all_results[task_description] = existing_results[task_description]
+
+    return save_retrieval_results(all_results, base_folder)
@@ -1,17 +1,19 @@
 import os
 import json
-from groq import Groq
-from dotenv import load_dotenv
-
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=groq_api_key)
-
-
-def synthesize(retrieval_results_path):
-
-    synthesis_system_prompt = """ 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.config import env, env_flag
+from utils.llm import complete_answer
+from utils.load_json import load_json
+from utils.prompt_packing import compact_json, estimate_tokens
+from utils.tracing import in_context, span
+
+# Pack several tasks into one completion instead of one call per task
+SYNTHESIS_BATCHED = env_flag("SYNTHESIS_BATCHED")
+SYNTHESIS_BATCH_TOKEN_BUDGET = int(env("SYNTHESIS_BATCH_TOKEN_BUDGET", "4000"))
+SYNTHESIS_MAX_BATCH_TASKS = int(env("SYNTHESIS_MAX_BATCH_TASKS", "4"))
+SYNTHESIS_MAX_WORKERS = int(env("SYNTHESIS_MAX_WORKERS", "4"))
+
+synthesis_system_prompt = """ 
 You are a research synthesis agent.
 
 You are given:
@@ -48,45 +50,195 @@ No explanation outside the <answer> block.
 Be analytical, concise, and structured.
 """
 
-    with open(retrieval_results_path, "r") as f:
-        retrieval_data = json.load(f)
+batch_synthesis_system_prompt = """
+You are a research synthesis agent.
 
-    synthesized_results = {}
+You are given several research tasks as a JSON object keyed by task id.
+Each entry has the task description and its structured retrieval results.
 
-    for task_description, task_sources in retrieval_data.items():
+Synthesize the retrieved evidence for EACH task independently.
 
-        formatted_prompt = synthesis_system_prompt.replace(
-            "{task_description}", task_description
-        )
+Strict requirements:
 
-        messages = [
-            {"role": "system", "content": formatted_prompt},
-            {"role": "user", "content": json.dumps(task_sources, indent=2)}
-        ]
+- Combine overlapping ideas across sources.
+- Identify recurring themes.
+- Do NOT summarize each source individually.
+- Do NOT invent new information.
+- Only use facts present in that task's retrieval data.
+- If evidence is weak or repetitive, state that clearly.
+- If retrieval results are empty, mark insufficient evidence.
 
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=messages,
-            stream=False
-        )
+Return ONLY structured JSON inside <answer> tags, with one entry per task id.
 
-        reply = completion.choices[0].message.content
+Output format:
+
+<answer>
+{
+  "T1": {
+    "task": "...",
+    "synthesized_summary": "...",
+    "core_concepts": ["...", "..."],
+    "strongly_supported_points": ["...", "..."],
+    "weak_or_missing_areas": ["..."]
+  }
+}
+</answer>
+
+No explanation outside the <answer> block.
+Be analytical, concise, and structured.
+"""
+
+SYNTHESIS_FIELDS = ["synthesized_summary", "core_concepts", "strongly_supported_points", "weak_or_missing_areas"]
 
-        start = reply.find("<answer>") + len("<answer>")
-        end = reply.find("</answer>")
-        json_text = reply[start:end].strip()
 
+def synthesize_task(task_description, task_sources):
+
+    formatted_prompt = synthesis_system_prompt.replace(
+        "{task_description}", task_description
+    )
+
+    messages = [
+        {"role": "system", "content": formatted_prompt},
+        {"role": "user", "content": json.dumps(task_sources, indent=2)}
+    ]
+
+    with span("synthesize_task", kind="task", task=task_description):
         try:
-            search_result = json.loads(json_text)
-        except json.JSONDecodeError:
-            search_result = {"error": "parse_failed", "raw": json_text}
+            return complete_answer(messages, agent="synthesis_agent")
+        except json.JSONDecodeError as e:
+            return {"error": "parse_failed", "raw": e.doc}
+        except ValueError:
+            return {"error": "parse_failed", "raw": ""}
 
-        synthesized_results[task_description] = search_result
 
-    output_folder = os.path.dirname(retrieval_results_path)
+def batch_tasks(task_items, token_budget=SYNTHESIS_BATCH_TOKEN_BUDGET, max_tasks=SYNTHESIS_MAX_BATCH_TASKS):
+    # Greedily fills batches until the next task would overflow the token budget;
+    # a task that is too large on its own ends up in a batch by itself
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for task_description, task_sources in task_items.items():
+        tokens = estimate_tokens(compact_json({"task": task_description, "retrieval_results": task_sources}))
+
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_tasks):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+
+        current.append(task_description)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def synthesize_batch(task_items):
+    if len(task_items) == 1:
+        task_description, task_sources = next(iter(task_items.items()))
+        return {task_description: synthesize_task(task_description, task_sources)}
+
+    task_ids = {f"T{i + 1}": task_description for i, task_description in enumerate(task_items)}
+
+    payload = {
+        task_id: {"task": task_description, "retrieval_results": task_items[task_description]}
+        for task_id, task_description in task_ids.items()
+    }
+
+    messages = [
+        {"role": "system", "content": batch_synthesis_system_prompt},
+        {"role": "user", "content": compact_json(payload)}
+    ]
+
+    with span("synthesize_batch", kind="task", tasks=len(task_ids)):
+        try:
+            answer = complete_answer(messages, agent="synthesis_agent")
+        except ValueError:
+            answer = {}
+
+    if not isinstance(answer, dict):
+        answer = {}
+
+    results = {}
+
+    for task_id, task_description in task_ids.items():
+        entry = answer.get(task_id)
+
+        if isinstance(entry, dict) and all(field in entry for field in SYNTHESIS_FIELDS):
+            entry["task"] = task_description
+            results[task_description] = entry
+        else:
+            # Only the broken entry pays for its own single-task call
+            print(f"Batched synthesis missing for task '{task_description}', retrying alone")
+            results[task_description] = synthesize_task(task_description, task_items[task_description])
+
+    return results
+
+
+def synthesize_tasks(task_items, batched=None, max_workers=SYNTHESIS_MAX_WORKERS, on_task_done=None):
+    # Tasks, or batches of them, are synthesized concurrently. on_task_done(task_description,
+    # synthesis) fires for each task as soon as the call it was part of returns.
+    if batched is None:
+        batched = SYNTHESIS_BATCHED
+
+    batches = batch_tasks(task_items) if batched else [[task_description] for task_description in task_items]
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            executor.submit(in_context(synthesize_batch), {d: task_items[d] for d in batch})
+            for batch in batches
+        ]
+        for future in as_completed(futures):
+            for task_description, synthesis in future.result().items():
+                results[task_description] = synthesis
+                if on_task_done:
+                    on_task_done(task_description, synthesis)
+
+    return {task_description: results[task_description] for task_description in task_items}
+
+
+def save_synthesis_results(synthesized_results, output_folder):
     output_path = os.path.join(output_folder, "synthesis_results.json")
 
     with open(output_path, "w") as f:
         json.dump(synthesized_results, f, indent=4)
 
-    return output_path
\ No newline at end of file
+    return output_path
+
+
+def is_synthesized(synthesis):
+    return isinstance(synthesis, dict) and "error" not in synthesis
+
+
+def synthesize(retrieval_results_path, incremental=False, batched=None, on_task_done=None):
+
+    with open(retrieval_results_path, "r") as f:
+        retrieval_data = json.load(f)
+
+    output_folder = os.path.dirname(retrieval_results_path)
+
+    # In incremental mode only tasks without a usable synthesis are sent to the LLM
+    existing_results = {}
+    if incremental:
+        existing_results = load_json(os.path.join(output_folder, "synthesis_results.json"), {})
+
+    pending = {
+        task_description: task_sources
+        for task_description, task_sources in retrieval_data.items()
+        if not is_synthesized(existing_results.get(task_description))
+    }
+
+    new_results = synthesize_tasks(pending, batched=batched, on_task_done=on_task_done)
+
+    synthesized_results = {}
+
+    for task_description in retrieval_data:
+        if task_description in new_results:
+            synthesized_results[task_description] = new_results[task_description]
+        else:
+            synthesized_results[task_description] = existing_results[task_description]
+
+    return save_synthesis_results(synthesized_results, output_folder)
@@ -1,23 +1,20 @@
-from groq import Groq
-from dotenv import load_dotenv
 import os
 import json
 import re
+from utils.llm import complete_answer
 
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=groq_api_key)
-
-def generate_tasks(user_input, research_context):
+def generate_tasks(user_input, research_context, output_folder=None):
 
     task_data_path = "model_output_data/"
 
-    lower_user_input = user_input.lower()
-    cleaned_text = re.sub(r'[^a-zA-Z0-9\s]+', '', lower_user_input)
-    folder_name_for_query = re.sub(r"\s+", "_", cleaned_text)
+    if output_folder:
+        complete_data_path_query = output_folder
+    else:
+        lower_user_input = user_input.lower()
+        cleaned_text = re.sub(r'[^a-zA-Z0-9\s]+', '', lower_user_input)
+        folder_name_for_query = re.sub(r"\s+", "_", cleaned_text)
 
-    complete_data_path_query = os.path.join(task_data_path, folder_name_for_query)
+        complete_data_path_query = os.path.join(task_data_path, folder_name_for_query)
 
     if not os.path.exists(complete_data_path_query):
         os.makedirs(complete_data_path_query, exist_ok=True)
@@ -52,19 +49,17 @@ Output ONLY valid JSON.
         {"role": "user", "content": user_input}
     ]
 
-    completion = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=messages,
-        stream=False
-    )
-
-    assistant_output = completion.choices[0].message.content
+    try:
+        tasks = complete_answer(messages, agent="task_agent")
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Task generation returned no usable answer: {e}")
+        return None
 
-    start = assistant_output.find("<answer>") + len("<answer>")
-    end = assistant_output.find("</answer>")
-
-    json_text = assistant_output[start:end].strip()
-    tasks = json.loads(json_text)
+    # Anything without a description cannot be researched
+    tasks = [
+        task for task in (tasks if isinstance(tasks, list) else [])
+        if isinstance(task, dict) and isinstance(task.get("description"), str) and task["description"].strip()
+    ]
 
     tasks_file_path = os.path.join(complete_data_path_query, "tasks.json")
 
@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.config import env
+
+# Pipeline output of the query running in the current context goes to its own log
+_query_log = contextvars.ContextVar("query_log", default=None)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a file of research queries concurrently.")
+    parser.add_argument("queries", help="Text file with one query per line; blank lines and # comments are skipped")
+    parser.add_argument("--concurrency", type=int, default=int(env("BATCH_CONCURRENCY", "3")),
+                        help="Queries researched at the same time")
+    parser.add_argument("--groq-rpm", type=float, help="Groq requests per minute shared by the whole batch")
+    parser.add_argument("--groq-tpm", type=float, help="Groq tokens per minute shared by the whole batch")
+    parser.add_argument("--tavily-rpm", type=float, help="Tavily requests per minute shared by the whole batch")
+    parser.add_argument("--verbose", action="store_true", help="Print pipeline output instead of writing it to run.log")
+    parser.add_argument("--json", help="Write the per-query results and summary to this file")
+    return parser.parse_args()
+
+
+def read_queries(path):
+    with open(path, "r") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+class QueryOutput:
+    # Sends writes to the log of the query whose context they come from, everything else to the console
+
+    def __init__(self, console):
+        self.console = console
+
+    def write(self, text):
+        log = _query_log.get()
+        return (log or self.console).write(text)
+
+    def flush(self):
+        log = _query_log.get()
+        (log or self.console).flush()
+
+
+class Progress:
+
+    def __init__(self, total, console):
+        self.total = total
+        self.console = console
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def show(self, query, status):
+        with self._lock:
+            self.console.write(f"[{self.done}/{self.total} done, {self.failed} failed] {query[:60]}: {status}\n")
+            self.console.flush()
+
+    def finish(self, query, ok, status):
+        with self._lock:
+            self.done += 1
+            self.failed += not ok
+        self.show(query, status)
+
+    def events(self, query):
+        stages = {}
+
+        def handle(event, data):
+            if event == "iteration_started":
+                self.show(query, f"iteration {data['iteration']}")
+            elif event == "stage_started":
+                stages[data["stage"]] = [0, data.get("total")]
+                self.show(query, f"{data['stage']} started")
+            elif event == "task_completed" and data["stage"] in stages:
+                stages[data["stage"]][0] += 1
+                completed, total = stages[data["stage"]]
+                self.show(query, f"{data['stage']} {completed}/{total if total is not None else '?'}")
+            elif event == "iteration_stopped":
+                self.show(query, f"stopped: {data['reason']}")
+
+        return handle
+
+
+def trace_tokens(trace_data):
+    spans = trace_data.get("spans", []) if trace_data else []
+    return sum(
+        span["attrs"].get("prompt_tokens", 0) + span["attrs"].get("completion_tokens", 0)
+        for span in spans
+    )
+
+
+def research_one(query, progress, verbose):
+    # Any failure stays with this query; the rest of the batch keeps running
+    from run_pipeline import BASE_PATH, clean_folder_name, run_research, run_store
+
+    result = {"query": query, "status": "failed", "run_id": None, "report": None, "tokens": 0, "error": None}
+    events = progress.events(query)
+
+    def handle(event, data):
+        if event == "run_started":
+            result["run_id"] = data["run_id"]
+        events(event, data)
+
+    folder_path = os.path.join(BASE_PATH, clean_folder_name(query))
+    os.makedirs(folder_path, exist_ok=True)
+    log = None if verbose else open(os.path.join(folder_path, "run.log"), "w")
+    token = _query_log.set(log)
+
+    started = time.monotonic()
+    try:
+        result["report"] = run_research(query, on_event=handle)
+        if result["report"]:
+            result["status"] = "completed"
+        else:
+            result["error"] = "no report generated"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        _query_log.reset(token)
+        if log:
+            log.close()
+
+    result["seconds"] = time.monotonic() - started
+    if result["run_id"]:
+        result["tokens"] = trace_tokens(run_store.load_output(result["run_id"], "trace"))
+
+    ok = result["status"] == "completed"
+    progress.finish(query, ok, f"{result['status']} in {result['seconds']:.0f}s" + ("" if ok else f" ({result['error']})"))
+    return result
+
+
+def run_batch(queries, concurrency, verbose=False):
+    from run_pipeline import clean_folder_name
+
+    # Queries that map to the same output folder would overwrite each other's files
+    unique = {}
+    for query in queries:
+        key = clean_folder_name(query)
+        if not key:
+            print(f"Skipping query without a usable name: {query!r}")
+        elif key in unique:
+            print(f"Skipping duplicate of '{unique[key]}': {query}")
+        else:
+            unique[key] = query
+    queries = list(unique.values())
+
+    console = sys.stdout
+    progress = Progress(len(queries), console)
+    sys.stdout = QueryOutput(console)
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch-query") as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, research_one, query, progress, verbose): query
+                for query in queries
+            }
+            results = {futures[future]: future.result() for future in as_completed(futures)}
+    finally:
+        sys.stdout = console
+
+    elapsed = time.monotonic() - started
+    return [results[query] for query in queries], elapsed
+
+
+def summarize(results, elapsed):
+    completed = [r for r in results if r["status"] == "completed"]
+    tokens = sum(r["tokens"] for r in results)
+
+    return {
+        "queries": len(results),
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "seconds": elapsed,
+        "queries_per_hour": len(completed) / elapsed * 3600 if elapsed else 0.0,
+        "tokens": tokens,
+        "tokens_per_query": tokens / len(results) if results else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    # Limits are read when the scheduler is imported; the one scheduler instance then
+    # paces every query in the batch against the same provider quota
+    for name, value in (("GROQ_REQUESTS_PER_MINUTE", args.groq_rpm), ("GROQ_TOKENS_PER_MINUTE", args.groq_tpm),
+                        ("TAVILY_REQUESTS_PER_MINUTE", args.tavily_rpm)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    queries = read_queries(args.queries)
+    if not queries:
+        print("No queries found.")
+        sys.exit(1)
+
+    results, elapsed = run_batch(queries, args.concurrency, verbose=args.verbose)
+    summary = summarize(results, elapsed)
+
+    print()
+    for r in results:
+        detail = r["report"] if r["status"] == "completed" else r["error"]
+        print(f"{r['status']:<10} {r['seconds']:7.1f}s {r['tokens']:8d} tok  {r['query'][:50]:<50} {detail}")
+    print(
+        f"\n{summary['completed']}/{summary['queries']} completed in {summary['seconds']:.1f}s: "
+        f"{summary['queries_per_hour']:.1f} queries/hour, {summary['tokens_per_query']:.0f} tokens/query"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+
+    sys.exit(1 if summary["failed"] else 0)
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.extract_json import answer_block, parse_json
+
+FIXTURE_ROOT = os.path.join(os.path.dirname(__file__), "..", "model_output_data")
+OUTPUT_FILES = ("tasks.json", "retrieval_results.json", "synthesis_results.json", "gap_results.json", "final_report.json")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Answers recovered from corrupted model replies: strict parsing vs local repair.")
+    parser.add_argument("--seed", type=int, default=3)
+    return parser.parse_args()
+
+
+def load_answers():
+    # Recorded stage outputs stand in for the JSON the agents get back from the model
+    answers = []
+    for name in sorted(os.listdir(FIXTURE_ROOT)):
+        for file_name in OUTPUT_FILES:
+            path = os.path.join(FIXTURE_ROOT, name, file_name)
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                data = json.load(f)
+            if file_name in ("retrieval_results.json", "synthesis_results.json"):
+                answers += [value for value in data.values() if value]
+            elif data:
+                answers.append(data)
+    return answers
+
+
+def trailing_commas(text, rng):
+    return text.replace("]", ",]").replace("}", ",}")
+
+
+def unescaped_quotes(text, rng):
+    words = [w for w in set(text.split()) if w.isalpha() and len(w) > 5]
+    word = rng.choice(words) if words else "value"
+    return text.replace(f" {word} ", f' "{word}" ', 1)
+
+
+def truncated(text, rng):
+    return text[:int(len(text) * rng.uniform(0.5, 0.95))]
+
+
+def raw_newlines(text, rng):
+    return text.replace(". ", ".\n", 3)
+
+
+def missing_tags(text, rng):
+    return None
+
+
+FAULTS = {
+    "trailing commas": trailing_commas,
+    "unescaped quotes": unescaped_quotes,
+    "truncated": truncated,
+    "raw newlines": raw_newlines,
+    "missing tags": missing_tags,
+}
+
+
+def strict(reply):
+    start = reply.find("<answer>")
+    end = reply.find("</answer>", start + 1)
+    if start == -1 or end == -1:
+        raise ValueError("No <answer> block found")
+    return json.loads(reply[start + len("<answer>"):end].strip())
+
+
+def tolerant(reply):
+    return parse_json(answer_block(reply))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rng = random.Random(args.seed)
+    answers = load_answers()
+
+    print(f"{len(answers)} recorded answers per fault")
+    print(f"{'fault':<18} {'strict':>8} {'repaired':>9} {'repair us':>10}")
+
+    for fault, corrupt in FAULTS.items():
+        ok = {"strict": 0, "repaired": 0}
+        seconds = 0.0
+
+        for answer in answers:
+            text = json.dumps(answer, indent=2)
+            corrupted = corrupt(text, rng)
+            if corrupted is None:
+                reply = f"Here is the result:\n```json\n{text}\n```"
+            else:
+                reply = f"<answer>\n{corrupted}\n</answer>" if fault != "truncated" else f"<answer>\n{corrupted}"
+
+            try:
+                strict(reply)
+                ok["strict"] += 1
+            except ValueError:
+                pass
+
+            started = time.perf_counter()
+            try:
+                tolerant(reply)
+                ok["repaired"] += 1
+            except ValueError:
+                pass
+            seconds += time.perf_counter() - started
+
+        print(
+            f"{fault:<18} {ok['strict'] / len(answers):8.0%} {ok['repaired'] / len(answers):9.0%} "
+            f"{seconds / len(answers) * 1e6:10.0f}"
+        )
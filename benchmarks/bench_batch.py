@@ -0,0 +1,78 @@
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import replay
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay the recorded queries as one batch at several concurrency levels.")
+    parser.add_argument("--concurrency", default="1,2,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--llm-latency", default="lognormal:0.4,0.3")
+    parser.add_argument("--search-latency", default="uniform:0.3,1.2")
+    parser.add_argument("--tokens-per-second", type=float, default=800)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the provider rate limits enabled")
+    parser.add_argument("--fail", type=int, default=1, help="Queries whose search backend raises, to check isolation")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    output_path = tempfile.mkdtemp(prefix="batch_")
+    replay.prepare_environment(output_path, rate_limits=args.rate_limits)
+    # Recalled tasks from an earlier level would hide the cost of the next one
+    os.environ["TASK_REUSE_THRESHOLD"] = "0"
+
+    import run_pipeline
+    import batch_research
+    from agents import retrieval_agent
+    from utils import llm
+
+    fixtures = replay.load_fixtures()
+    queries = [fixture["query"] for fixture in fixtures.values()]
+    failing = [f"Broken topic number {i + 1}" for i in range(args.fail)]
+
+    replay.install(
+        llm_latency=args.llm_latency,
+        search_latency=args.search_latency,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed,
+    )
+
+    completions = llm.client.chat.completions
+    create = completions.create
+
+    def flaky_create(**params):
+        if any("Broken topic" in (m.get("content") or "") for m in params["messages"]):
+            raise RuntimeError("model backend unavailable")
+        return create(**params)
+
+    completions.create = flaky_create
+
+    print(f"{len(queries)} recorded queries + {len(failing)} failing, llm={args.llm_latency} search={args.search_latency}")
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        llm.completion_cache.clear()
+        retrieval_agent.search_cache.clear()
+        for query in queries + failing:
+            shutil.rmtree(os.path.join(run_pipeline.BASE_PATH, run_pipeline.clean_folder_name(query)), ignore_errors=True)
+
+        with open(os.devnull, "w") as quiet:
+            console, sys.stdout = sys.stdout, quiet
+            try:
+                results, elapsed = batch_research.run_batch(queries + failing, concurrency)
+            finally:
+                sys.stdout = console
+        summary = batch_research.summarize(results, elapsed)
+
+        print(
+            f"concurrency={concurrency:<3} wall={elapsed:6.1f}s completed={summary['completed']}/{summary['queries']} "
+            f"queries/hour={summary['queries_per_hour']:7.0f} tokens/query={summary['tokens_per_query']:6.0f}"
+        )
+
+    shutil.rmtree(output_path, ignore_errors=True)
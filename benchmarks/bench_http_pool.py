@@ -0,0 +1,141 @@
+import os
+import sys
+import ssl
+import json
+import time
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# The mock server only speaks HTTP/1.1, so compare plain keep-alive pooling
+os.environ["HTTP2_DISABLED"] = "1"
+
+from utils import http_pool
+from utils.search_client import TavilySearch
+
+SERVER_LATENCY = 0.02
+NUM_TASKS = 8
+WORKERS = 4
+
+# Calls made by one research iteration: (agent, provider)
+RUN_CALLS = (
+    [("task_agent", "groq")]
+    + [("retrieval_agent", "tavily")] * NUM_TASKS
+    + [("retrieval_agent", "groq")] * NUM_TASKS
+    + [("synthesis_agent", "groq")] * NUM_TASKS
+    + [("gap_agent", "groq"), ("report_agent", "groq")]
+)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(SERVER_LATENCY)
+
+        if self.path.startswith("/search"):
+            body = {"results": [{"title": "t", "url": "https://example.com", "content": "c"}]}
+        else:
+            body = {"choices": [{"message": {"content": "<answer>[]</answer>"}}]}
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(folder):
+    cert_path = os.path.join(folder, "cert.pem")
+    key_path = os.path.join(folder, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key_path, "-out", cert_path],
+        check=True, capture_output=True
+    )
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+
+    server = ThreadingHTTPServer(("localhost", 0), MockHandler)
+    server.daemon_threads = True
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"https://localhost:{server.server_address[1]}"
+
+
+def call(client, base_url, provider):
+    if provider == "tavily":
+        TavilySearch("test", base_url=base_url, http_client=client).search("query", max_results=5)
+    else:
+        response = client.post(f"{base_url}/openai/v1/chat/completions", json={"messages": []})
+        response.raise_for_status()
+
+
+def run(base_url, mode, runs):
+    # per-call: a fresh connection for every request (what the Tavily SDK does)
+    # per-agent: one client per agent module
+    # shared: the process-wide pool from utils.http_pool
+    http_pool.reset_stats()
+    agent_clients = {}
+    lock = threading.Lock()
+
+    def client_for(agent):
+        if mode == "shared":
+            return http_pool.sync_client()
+        with lock:
+            if agent not in agent_clients:
+                agent_clients[agent] = http_pool.new_client(verify=False)
+            return agent_clients[agent]
+
+    def one_call(agent_provider):
+        agent, provider = agent_provider
+        if mode == "per-call":
+            with http_pool.new_client(verify=False) as client:
+                call(client, base_url, provider)
+        else:
+            call(client_for(agent), base_url, provider)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        for _ in range(runs):
+            list(executor.map(one_call, RUN_CALLS))
+    elapsed = time.perf_counter() - start
+
+    for client in agent_clients.values():
+        client.close()
+
+    return elapsed, http_pool.connection_stats()["localhost"]
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    with tempfile.TemporaryDirectory() as folder:
+        server, base_url = start_server(folder)
+
+        # The shared pool must trust the self-signed mock certificate
+        http_pool._clients["sync"] = http_pool._build("sync", verify=False)
+
+        baseline = None
+        for mode in ["per-call", "per-agent", "shared"]:
+            elapsed, stats = run(base_url, mode, runs)
+            baseline = baseline if baseline is not None else stats["tls_handshakes"]
+            print(
+                f"{mode:<9} runs={runs} requests={stats['requests']} "
+                f"tls_handshakes={stats['tls_handshakes']} reused={stats['reused']} "
+                f"saved={baseline - stats['tls_handshakes']} wall={elapsed:.2f}s"
+            )
+
+        http_pool.close()
+        server.shutdown()
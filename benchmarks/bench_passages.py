@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.passage_ranker import SNIPPET_CHARS, select_passages
+from utils.prompt_packing import compact_json, estimate_tokens
+
+FIXTURE_ROOT = os.path.join(os.path.dirname(__file__), "..", "model_output_data")
+PAGES_PER_TASK = 5
+
+BOILERPLATE = [
+    "Skip to main content.",
+    "Accept all cookies to continue browsing this site.",
+    "Subscribe to our newsletter for weekly updates.",
+    "Share this article on social media.",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prompt size and evidence recall of the snippet prefix cut vs passage ranking.")
+    parser.add_argument("--budget", type=int, default=1000, help="Per-task token budget for ranked passages")
+    parser.add_argument("--filler", type=int, default=2500, help="Characters of off-topic text per page")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def load_evidence():
+    # Recorded key points per task; they stand in for the sentences a page must surface
+    evidence = {}
+    for name in sorted(os.listdir(FIXTURE_ROOT)):
+        path = os.path.join(FIXTURE_ROOT, name, "retrieval_results.json")
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            results = json.load(f)
+        for task, items in results.items():
+            points = []
+            for item in items if isinstance(items, list) else []:
+                points += [str(p).strip() for p in item.get("key_points", []) if len(str(p).strip()) > 20]
+            if points:
+                evidence[task] = points
+    return evidence
+
+
+def build_pages(task, points, others, rng, filler_chars):
+    # Each page buries a few relevant sentences at random depths in boilerplate and off-topic text
+    pages = []
+    for page in range(PAGES_PER_TASK):
+        relevant = points[page::PAGES_PER_TASK]
+        filler = []
+        while sum(len(s) for s in filler) < filler_chars:
+            filler.append(rng.choice(others))
+        for sentence in relevant:
+            filler.insert(rng.randrange(len(filler) + 1), sentence)
+        pages.append((" ".join(BOILERPLATE[:rng.randrange(len(BOILERPLATE) + 1)] + filler), relevant))
+    return pages
+
+
+def recall(snippets, pages):
+    expected = [sentence for _, relevant in pages for sentence in relevant]
+    found = sum(any(sentence in snippet for snippet in snippets) for sentence in expected)
+    return found, len(expected)
+
+
+def prompt_tokens(snippets, indent):
+    results = [{"title": f"Page {i}", "url": f"https://example.com/{i}", "snippet": s} for i, s in enumerate(snippets)]
+    text = json.dumps(results, indent=2) if indent else compact_json(results)
+    return estimate_tokens(text)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rng = random.Random(args.seed)
+    evidence = load_evidence()
+
+    totals = {"cut": [0, 0, 0, 0.0], "ranked": [0, 0, 0, 0.0]}
+
+    for task, points in evidence.items():
+        others = [p for other, other_points in evidence.items() if other != task for p in other_points]
+        pages = build_pages(task, points, others, rng, args.filler)
+        documents = [text for text, _ in pages]
+
+        started = time.perf_counter()
+        cut = [document[:SNIPPET_CHARS] for document in documents]
+        cut_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        ranked = select_passages(task, documents, args.budget)
+        ranked_seconds = time.perf_counter() - started
+
+        for label, snippets, indent, seconds in (("cut", cut, True, cut_seconds), ("ranked", ranked, False, ranked_seconds)):
+            found, expected = recall(snippets, pages)
+            entry = totals[label]
+            entry[0] += prompt_tokens(snippets, indent)
+            entry[1] += found
+            entry[2] += expected
+            entry[3] += seconds
+
+    tasks = len(evidence)
+    print(f"{tasks} tasks x {PAGES_PER_TASK} pages, {args.filler} chars of filler per page, budget={args.budget} tokens")
+    for label, (tokens, found, expected, seconds) in totals.items():
+        print(
+            f"{label:<7} prompt tokens/task={tokens / tasks:7.1f} "
+            f"evidence recall={found / max(expected, 1):6.1%} "
+            f"cpu/task={seconds / tasks * 1000:6.2f}ms"
+        )
@@ -0,0 +1,138 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import replay
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay recorded research runs end to end without network access.")
+    parser.add_argument("--fixtures", help="Comma-separated model_output_data folders to replay (default: all)")
+    parser.add_argument("--llm-latency", default="lognormal:0.4,0.3", help="Time to first token, e.g. const:0.5, uniform:0.2,1, lognormal:0.4,0.3")
+    parser.add_argument("--search-latency", default="lognormal:0.6,0.4", help="Search latency distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=800, help="Simulated generation speed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm", action="store_true", help="Keep caches and outputs between runs")
+    parser.add_argument("--api", action="store_true", help="Also run each query through the FastAPI endpoints")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the provider rate limits enabled")
+    parser.add_argument("--json", help="Write the results to this file")
+    return parser.parse_args()
+
+
+def measure(run, counters):
+    counters.reset()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    with redirect_stdout(io.StringIO()):
+        ok = run()
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    usage = counters.snapshot()
+    return {
+        "ok": bool(ok),
+        "wall": elapsed,
+        "llm_calls": sum(n for kind, n in usage["calls"].items() if kind.startswith("llm:")),
+        "search_calls": usage["calls"].get("search", 0),
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "peak_mb": peak / 2 ** 20,
+        "calls": usage["calls"],
+    }
+
+
+def run_via_api(client, query):
+    job = client.post("/api/research", json={"query": query}).json()
+
+    with client.stream("GET", f"/api/research/{job['job_id']}/events") as events:
+        for line in events.iter_lines():
+            if line.startswith("event: job_"):
+                break
+
+    return client.get(f"/api/research/{job['job_id']}/result").status_code == 200
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    output_path = tempfile.mkdtemp(prefix="replay_")
+    replay.prepare_environment(output_path, rate_limits=args.rate_limits)
+    # Every API submission should run the pipeline instead of reusing the last result
+    os.environ["RESULT_FRESHNESS_SECONDS"] = "0"
+
+    import run_pipeline
+    from agents import retrieval_agent
+    from utils import llm
+
+    fixtures = replay.load_fixtures()
+    if args.fixtures:
+        fixtures = {name: fixtures[name] for name in args.fixtures.split(",")}
+
+    _, counters = replay.install(
+        llm_latency=args.llm_latency,
+        search_latency=args.search_latency,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed,
+    )
+
+    def reset(query):
+        if args.warm:
+            return
+        llm.completion_cache.clear()
+        retrieval_agent.search_cache.clear()
+        shutil.rmtree(os.path.join(run_pipeline.BASE_PATH, run_pipeline.clean_folder_name(query)), ignore_errors=True)
+
+    modes = [("pipeline", lambda query: run_pipeline.run_research(query))]
+    if args.api:
+        from fastapi.testclient import TestClient
+        import main
+
+        api_client = TestClient(main.app)
+        api_client.__enter__()
+        modes.append(("api", lambda query: run_via_api(api_client, query)))
+
+    print(
+        f"llm={args.llm_latency} search={args.search_latency} tps={args.tokens_per_second:g} "
+        f"caches={'warm' if args.warm else 'cold'}"
+    )
+    print(f"{'fixture':<40} {'mode':<8} {'ok':<3} {'wall':>7} {'llm':>4} {'search':>6} {'prompt_tok':>10} {'compl_tok':>9} {'peak_mb':>7}")
+
+    results = []
+    for name, fixture in fixtures.items():
+        for mode, run in modes:
+            reset(fixture["query"])
+            result = measure(lambda: run(fixture["query"]), counters)
+            results.append({"fixture": name, "mode": mode, **result})
+            print(
+                f"{name[:40]:<40} {mode:<8} {'y' if result['ok'] else 'n':<3} {result['wall']:>6.2f}s "
+                f"{result['llm_calls']:>4} {result['search_calls']:>6} {result['prompt_tokens']:>10} "
+                f"{result['completion_tokens']:>9} {result['peak_mb']:>7.1f}"
+            )
+
+    total_wall = sum(r["wall"] for r in results)
+    print(
+        f"total: runs={len(results)} wall={total_wall:.2f}s "
+        f"llm_calls={sum(r['llm_calls'] for r in results)} "
+        f"tokens={sum(r['prompt_tokens'] + r['completion_tokens'] for r in results)}"
+    )
+
+    if args.api:
+        api_client.__exit__(None, None, None)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    shutil.rmtree(output_path, ignore_errors=True)
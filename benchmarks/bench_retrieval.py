@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Keep stub results out of the real search cache
+CACHE_FOLDER = tempfile.mkdtemp()
+os.environ["SEARCH_CACHE_PATH"] = os.path.join(CACHE_FOLDER, "search_cache.sqlite")
+os.environ["LLM_CACHE_PATH"] = os.path.join(CACHE_FOLDER, "llm_cache.sqlite")
+# Stub providers have no quota, so measure without the rate limiter in the way
+os.environ["GROQ_REQUESTS_PER_MINUTE"] = os.environ["GROQ_TOKENS_PER_MINUTE"] = "0"
+os.environ["TAVILY_REQUESTS_PER_MINUTE"] = "0"
+
+from agents import retrieval_agent
+from utils import llm
+
+SEARCH_LATENCY = 0.4
+LLM_LATENCY = 0.6
+NUM_TASKS = 8
+
+
+class StubTavily:
+    # Neighbouring tasks share some pages, like overlapping real task lists do
+    def search(self, query, **kwargs):
+        time.sleep(SEARCH_LATENCY)
+        task_number = int(query.split()[-1])
+        pages = [(task_number * 3 + i) % (NUM_TASKS * 3) for i in range(5)]
+        return {"results": [
+            {"title": f"Result {page}", "url": f"https://example.com/{page}", "content": f"Page {page} " * 50}
+            for page in pages
+        ]}
+
+
+STUB_REPLY = '<answer>[{"source": "https://example.com/0", "title": "Result 0", "summary": "", "key_points": []}]</answer>'
+
+
+class StubDelta:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubChunk:
+    def __init__(self, content):
+        self.choices = [StubChoice(content)]
+
+
+class StubChoice:
+    def __init__(self, content):
+        self.delta = StubDelta(content)
+
+
+class StubCompletions:
+    calls = 0
+
+    def create(self, **kwargs):
+        StubCompletions.calls += 1
+        time.sleep(LLM_LATENCY)
+        return iter([StubChunk(STUB_REPLY[i:i + 16]) for i in range(0, len(STUB_REPLY), 16)])
+
+
+class StubChat:
+    def __init__(self):
+        self.completions = StubCompletions()
+
+
+class StubGroq:
+    def __init__(self):
+        self.chat = StubChat()
+
+
+def run(tasks_file_path, max_workers, clear_cache=True, dedupe=True):
+    if clear_cache:
+        retrieval_agent.search_cache.clear()
+        llm.completion_cache.clear()
+
+    retrieval_agent.DEDUPE_SOURCES = dedupe
+    StubCompletions.calls = 0
+
+    start = time.perf_counter()
+    output_path = retrieval_agent.retrieve(tasks_file_path, max_workers=max_workers)
+    elapsed = time.perf_counter() - start
+
+    with open(output_path, "r") as f:
+        results = json.load(f)
+
+    return elapsed, list(results)
+
+
+if __name__ == "__main__":
+    retrieval_agent.tavily = StubTavily()
+    llm.client = StubGroq()
+
+    with tempfile.TemporaryDirectory() as folder:
+        tasks = [{"description": f"Task {i}", "priority": 5, "type": "research"} for i in range(NUM_TASKS)]
+        tasks_file_path = os.path.join(folder, "tasks.json")
+        with open(tasks_file_path, "w") as f:
+            json.dump(tasks, f)
+
+        expected_order = [t["description"] for t in tasks]
+
+        for workers in [1, 2, 4, 8]:
+            elapsed, order = run(tasks_file_path, workers)
+            assert order == expected_order, "retrieval_results.json ordering changed"
+            print(f"workers={workers:<2} tasks={NUM_TASKS} wall={elapsed:.2f}s llm_calls={StubCompletions.calls}")
+
+        for dedupe in [False, True]:
+            elapsed, _ = run(tasks_file_path, 4, dedupe=dedupe)
+            print(f"dedupe={dedupe!s:<5} wall={elapsed:.2f}s llm_calls={StubCompletions.calls}")
+
+        cold, _ = run(tasks_file_path, 4)
+        warm, _ = run(tasks_file_path, 4, clear_cache=False)
+        print(f"caches: cold={cold:.2f}s warm={warm:.2f}s")
+        print(f"  search: {retrieval_agent.search_cache.stats()}")
+        print(f"  llm: {llm.cache_stats()}")
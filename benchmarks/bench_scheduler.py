@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RequestScheduler
+
+QUOTA_PER_MINUTE = 600
+CALL_LATENCY = 0.05
+NUM_CALLS = 100
+WORKERS = 8
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": f"{retry_after:.3f}"}})()
+
+
+class QuotaProvider:
+    # Replenishes its quota continuously like Groq's limits do, scaled down from one
+    # minute to one second so the benchmark finishes quickly
+    def __init__(self, per_minute):
+        self.limit = per_minute / 60
+        self.level = self.limit
+        self.updated = time.monotonic()
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            now = time.monotonic()
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit)
+            self.updated = now
+            if self.level < 1:
+                self.rejected += 1
+                raise RateLimited((1 - self.level) / self.limit)
+            self.level -= 1
+        time.sleep(CALL_LATENCY)
+        return "ok"
+
+
+def run(mode):
+    provider = QuotaProvider(QUOTA_PER_MINUTE)
+    scheduled = RequestScheduler(
+        limits={"mock": {"requests_per_minute": QUOTA_PER_MINUTE if mode == "scheduled" else 0, "tokens_per_minute": 0}},
+        max_retries=0 if mode == "no-retry" else 8
+    )
+    # Match the bucket's burst to the provider's scaled-down quota
+    limiter = scheduled.limiter("mock")
+    limiter.requests.capacity = limiter.requests.level = provider.limit
+
+    def one_call(_):
+        try:
+            return scheduled.call("mock", provider)
+        except RateLimited:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        results = list(executor.map(one_call, range(NUM_CALLS)))
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(1 for r in results if r is not None)
+    return succeeded, provider.rejected, elapsed, scheduled.stats()["mock"]
+
+
+def priority_latency():
+    # 40 background calls are queued ahead of one interactive call on a 10 req/s budget
+    scheduled = RequestScheduler(limits={"mock": {"requests_per_minute": QUOTA_PER_MINUTE, "tokens_per_minute": 0}})
+    limiter = scheduled.limiter("mock")
+    limiter.requests.level = 0
+    finished = {}
+
+    def call(name, priority):
+        scheduled.call("mock", lambda: None, priority=priority)
+        finished[name] = time.perf_counter()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=call, args=(f"bg{i}", PRIORITY_BACKGROUND)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=call, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    for thread in threads + [interactive]:
+        thread.join()
+
+    order = sorted(finished, key=finished.get)
+    return finished["interactive"] - start, order.index("interactive") + 1
+
+
+if __name__ == "__main__":
+    ceiling = QUOTA_PER_MINUTE / 60
+    print(f"quota={ceiling:.0f} req/s calls={NUM_CALLS} workers={WORKERS}")
+
+    for mode in ["no-retry", "retry-only", "scheduled"]:
+        succeeded, rejected, elapsed, stats = run(mode)
+        print(
+            f"{mode:<10} ok={succeeded}/{NUM_CALLS} 429s={rejected} retries={stats['retries']} "
+            f"wall={elapsed:.2f}s throughput={succeeded / elapsed:.1f} req/s"
+        )
+
+    latency, position = priority_latency()
+    print(f"priority: interactive call served #{position} of 41 after {latency:.2f}s")
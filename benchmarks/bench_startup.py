@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Runs in a fresh interpreter inside the tree being measured
+PROBE = """
+import json, time
+started = time.perf_counter()
+import run_pipeline
+pipeline_imported = time.perf_counter()
+import main
+main_imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    request_started = time.perf_counter()
+    client.get("/api/runs")
+    first_request = time.perf_counter() - request_started
+
+from utils import llm
+client_started = time.perf_counter()
+try:
+    getattr(llm, "get_client", lambda: llm.client)()
+    first_client = time.perf_counter() - client_started
+except Exception:
+    first_client = None
+
+print(json.dumps({
+    "import_run_pipeline": pipeline_imported - started,
+    "import_main": main_imported - started,
+    "first_request": first_request,
+    "first_client": first_client,
+}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cold import and first-request latency of main.app.")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--compare", help="Also measure this git revision, e.g. HEAD~1")
+    return parser.parse_args()
+
+
+def export_revision(revision, folder):
+    archive = subprocess.run(["git", "-C", REPO_ROOT, "archive", revision], check=True, capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", folder], input=archive, check=True)
+
+
+def probe(tree, output_path, with_keys=True):
+    environment = {key: value for key, value in os.environ.items() if key not in ("GROQ_API_KEY", "TAVILY_SEARCH_API")}
+    environment["RESEARCH_OUTPUT_PATH"] = output_path
+    environment["LLM_CACHE_PATH"] = os.path.join(output_path, "llm_cache.sqlite")
+    environment["SEARCH_CACHE_PATH"] = os.path.join(output_path, "search_cache.sqlite")
+    if with_keys:
+        environment["GROQ_API_KEY"] = environment["TAVILY_SEARCH_API"] = "startup-benchmark"
+
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=tree, env=environment, capture_output=True, text=True
+    )
+    # Startup hooks may print too, so the measurements are the line the probe wrote as JSON
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        return None
+    return json.loads(lines[-1])
+
+
+def measure(label, tree, repeat):
+    output_path = tempfile.mkdtemp(prefix="startup_")
+    try:
+        # The first start writes the tree's bytecode cache and is not counted
+        probe(tree, output_path)
+        samples = [probe(tree, output_path) for _ in range(repeat)]
+        samples = [s for s in samples if s is not None]
+        without_keys = probe(tree, output_path, with_keys=False) is not None
+    finally:
+        shutil.rmtree(output_path, ignore_errors=True)
+
+    if not samples:
+        print(f"{label:<10} failed to start")
+        return
+
+    def median_ms(key):
+        values = [s[key] for s in samples if s[key] is not None]
+        return statistics.median(values) * 1000 if values else float("nan")
+
+    print(
+        f"{label:<10} import run_pipeline={median_ms('import_run_pipeline'):7.1f}ms "
+        f"import main={median_ms('import_main'):7.1f}ms "
+        f"first request={median_ms('first_request'):6.1f}ms "
+        f"first Groq client={median_ms('first_client'):6.1f}ms "
+        f"imports without keys={'ok' if without_keys else 'FAILS'}"
+    )
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"median of {args.repeat} cold starts")
+
+    if args.compare:
+        with tempfile.TemporaryDirectory() as folder:
+            export_revision(args.compare, folder)
+            measure(args.compare, folder, args.repeat)
+
+    measure("current", REPO_ROOT, args.repeat)
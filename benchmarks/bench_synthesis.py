@@ -0,0 +1,88 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import replay
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-task vs batched synthesis on the recorded task lists, retrieval included.")
+    parser.add_argument("--fixtures", help="Comma-separated model_output_data folders to replay (default: all)")
+    parser.add_argument("--llm-latency", default="lognormal:0.4,0.3")
+    parser.add_argument("--search-latency", default="lognormal:0.6,0.4")
+    parser.add_argument("--tokens-per-second", type=float, default=800)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    output_path = tempfile.mkdtemp(prefix="synthesis_")
+    replay.prepare_environment(output_path)
+    # Recalled tasks would skip the synthesis being measured
+    os.environ["TASK_REUSE_THRESHOLD"] = "0"
+
+    import run_pipeline
+    from agents import retrieval_agent
+    from agents.retrieval_agent import retrieve
+    from agents.synthesis_agent import synthesize
+    from utils import llm
+
+    fixtures = replay.load_fixtures()
+    if args.fixtures:
+        fixtures = {name: fixtures[name] for name in args.fixtures.split(",")}
+
+    def pipelined(batched):
+        return lambda tasks_path: run_pipeline.retrieve_and_synthesize(tasks_path, batched=batched)
+
+    def staged(batched):
+        return lambda tasks_path: (None, synthesize(retrieve(tasks_path), batched=batched))
+
+    # The default path streams each retrieved task into its own synthesis call
+    modes = {
+        "pipelined": pipelined(False),
+        "pipelined+batched": pipelined(True),
+        "staged+batched": staged(True),
+    }
+
+    print(f"{len(fixtures)} task lists, llm={args.llm_latency} search={args.search_latency}")
+    print(f"{'mode':<18} {'wall':>7} {'synth calls':>12} {'prompt tok':>11}")
+
+    for mode, run in modes.items():
+        _, counters = replay.install(
+            llm_latency=args.llm_latency,
+            search_latency=args.search_latency,
+            tokens_per_second=args.tokens_per_second,
+            seed=args.seed,
+            fixtures=fixtures,
+        )
+        wall = 0.0
+
+        for name, fixture in fixtures.items():
+            llm.completion_cache.clear()
+            retrieval_agent.search_cache.clear()
+
+            folder = os.path.join(output_path, mode, name)
+            os.makedirs(folder, exist_ok=True)
+            tasks_path = os.path.join(folder, "tasks.json")
+            with open(tasks_path, "w") as f:
+                json.dump(fixture["tasks"], f)
+
+            started = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                run(tasks_path)
+            wall += time.perf_counter() - started
+
+        usage = counters.snapshot()
+        print(f"{mode:<18} {wall:6.2f}s {usage['calls'].get('llm:synthesis', 0):12d} {usage['prompt_tokens']:11d}")
+
+    shutil.rmtree(output_path, ignore_errors=True)
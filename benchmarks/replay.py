@@ -0,0 +1,333 @@
+import os
+import re
+import json
+import math
+import random
+import threading
+import time
+import zlib
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FIXTURE_PATH = os.path.join(REPO_ROOT, "model_output_data")
+
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_CHARS = 48
+
+
+class LatencyModel:
+    # "const:0.5", "uniform:0.2,1.0" or "lognormal:0.6,0.4" (median seconds, sigma)
+
+    def __init__(self, spec="const:0", seed=0):
+        kind, _, args = spec.partition(":")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        if kind not in ("const", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self):
+        with self._lock:
+            if self.kind == "const":
+                return self.args[0] if self.args else 0.0
+            if self.kind == "uniform":
+                return self.random.uniform(self.args[0], self.args[1])
+            return self.random.lognormvariate(math.log(self.args[0]), self.args[1])
+
+    def sleep(self):
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def load_fixtures(base_path=FIXTURE_PATH):
+    # Every recorded run with a task list becomes a replay fixture keyed by folder name
+    fixtures = {}
+    for folder in sorted(os.listdir(base_path)):
+        folder_path = os.path.join(base_path, folder)
+        tasks_path = os.path.join(folder_path, "tasks.json")
+        if not os.path.isfile(tasks_path):
+            continue
+
+        def read(name, default):
+            path = os.path.join(folder_path, name)
+            if not os.path.exists(path):
+                return default
+            with open(path, "r") as f:
+                return json.load(f)
+
+        fixtures[folder] = {
+            "query": folder.replace("_", " "),
+            "tasks": read("tasks.json", []),
+            "retrieval": read("retrieval_results.json", {}),
+            "synthesis": read("synthesis_results.json", {}),
+            "gap": read("gap_results.json", {"global_gaps": [], "suggested_new_tasks": []}),
+            "report": read("final_report.json", None),
+        }
+    return fixtures
+
+
+def result_url(fixture_name, source):
+    # Recorded sources are sometimes site names rather than URLs
+    source = str(source)
+    if source.startswith("http"):
+        return source
+    return f"https://replay.local/{fixture_name}/{zlib.crc32(source.encode('utf-8'))}"
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class Counters:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+    def record(self, kind, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+class ReplayIndex:
+    # Looks recorded outputs up by task description, URL or topic
+
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self.task_fixture = {}
+        self.items_by_url = {}
+        for name, fixture in fixtures.items():
+            for task in fixture["tasks"]:
+                self.task_fixture.setdefault(task["description"], name)
+            for items in fixture["retrieval"].values():
+                for item in items if isinstance(items, list) else []:
+                    self.items_by_url.setdefault(result_url(name, item.get("source", "")), item)
+
+    def fixture_for_topic(self, topic):
+        folder = re.sub(r"\s+", "_", re.sub(r"[^a-z0-9\s]+", "", topic.lower()).strip())
+        return self.fixtures.get(folder)
+
+    def fixture_for_text(self, text):
+        # The fixture whose task descriptions appear most often in the text
+        counts = {}
+        for description, name in self.task_fixture.items():
+            if description in text:
+                counts[name] = counts.get(name, 0) + 1
+        if not counts:
+            return None
+        return self.fixtures[max(counts, key=counts.get)]
+
+    def task_in(self, text):
+        matches = [d for d in self.task_fixture if d in text]
+        return max(matches, key=len) if matches else None
+
+    def search_results(self, query):
+        name = self.task_fixture.get(query)
+        items = self.fixtures[name]["retrieval"].get(query, []) if name else []
+        if not isinstance(items, list) or not items:
+            # Unknown queries (gap follow-up tasks) get stable synthetic pages
+            slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:60]
+            return [
+                {"title": f"{query} ({i + 1})", "url": f"https://replay.local/{slug}/{i}", "content": f"Synthetic page {i} about {query}. " * 8}
+                for i in range(3)
+            ]
+
+        return [
+            {
+                "title": item.get("title", ""),
+                "url": result_url(name, item.get("source", "")),
+                "content": " ".join([item.get("summary", "")] + [str(p) for p in item.get("key_points", [])]),
+            }
+            for item in items
+        ]
+
+
+class ReplaySearch:
+    # Stands in for TavilySearch
+
+    def __init__(self, index, latency, counters):
+        self.index = index
+        self.latency = latency
+        self.counters = counters
+
+    def search(self, query, **params):
+        self.latency.sleep()
+        self.counters.record("search")
+        return {"query": query, "results": self.index.search_results(query)}
+
+
+class _Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class ReplayCompletions:
+
+    def __init__(self, index, latency, counters, tokens_per_second):
+        self.index = index
+        self.latency = latency
+        self.counters = counters
+        self.tokens_per_second = tokens_per_second
+
+    def answer_for(self, messages):
+        system = messages[0]["content"]
+        user = messages[-1]["content"] if len(messages) > 1 else ""
+
+        if "initial research plan" in system:
+            topic = re.search(r'topic: "(.*?)"', system)
+            fixture = self.index.fixture_for_topic(topic.group(1)) if topic else None
+            if fixture and fixture["tasks"]:
+                return "task", fixture["tasks"]
+            subject = topic.group(1) if topic else "the topic"
+            return "task", [
+                {"description": f"{aspect} of {subject}", "priority": 5, "type": "research"}
+                for aspect in ("Overview", "Key applications", "Open challenges")
+            ]
+
+        if "research retrieval agent" in system:
+            payload = json.loads(user.split("\n\n", 1)[1])
+            items = []
+            for result in payload:
+                recorded = self.index.items_by_url.get(result["url"])
+                items.append({
+                    "source": result["url"],
+                    "title": result.get("title", ""),
+                    "summary": recorded["summary"] if recorded else result.get("snippet", "")[:300],
+                    "key_points": recorded.get("key_points", []) if recorded else [],
+                })
+            return "retrieval", items
+
+        if "research synthesis agent" in system and "keyed by task id" in system:
+            payload = json.loads(user)
+            return "synthesis", {
+                task_id: self.synthesis(entry["task"], entry["retrieval_results"])
+                for task_id, entry in payload.items()
+            }
+
+        if "research synthesis agent" in system:
+            task = self.index.task_in(system)
+            match = re.search(r'"task": "(.*?)"', system)
+            return "synthesis", self.synthesis(task or (match.group(1) if match else ""), json.loads(user))
+
+        if "gap detection" in system:
+            fixture = self.index.fixture_for_text(user)
+            return "gap", fixture["gap"] if fixture else {"global_gaps": [], "suggested_new_tasks": []}
+
+        if "ONE section of a research report" in system:
+            payload = json.loads(user)
+            task, synthesis = next(iter(payload.items()), ("", {}))
+            fixture = self.index.fixture_for_text(user)
+            for section in (fixture["report"] or {}).get("research_sections", []) if fixture else []:
+                if isinstance(section, dict) and section.get("task") == task:
+                    return "report", {"summary": section.get("summary", ""), "key_findings": section.get("key_findings", [])}
+            return "report", {
+                "summary": synthesis.get("synthesized_summary", "") if isinstance(synthesis, dict) else "",
+                "key_findings": synthesis.get("strongly_supported_points", []) if isinstance(synthesis, dict) else [],
+            }
+
+        if "drafted sections" in system:
+            fixture = self.index.fixture_for_text(user)
+            report = fixture["report"] if fixture and fixture["report"] else {}
+            return "report", {
+                "executive_summary": report.get("executive_summary", "Replayed report."),
+                "overall_assessment": report.get("overall_assessment", {"strengths": [], "limitations": []}),
+                "recommended_next_steps": report.get("recommended_next_steps", []),
+            }
+
+        if "report generation" in system:
+            fixture = self.index.fixture_for_text(user)
+            if fixture and fixture["report"]:
+                return "report", fixture["report"]
+            return "report", {"executive_summary": "Replayed report.", "research_sections": []}
+
+        return "other", []
+
+    def synthesis(self, task, sources):
+        name = self.index.task_fixture.get(task)
+        recorded = self.index.fixtures[name]["synthesis"].get(task) if name else None
+        if isinstance(recorded, dict) and "synthesized_summary" in recorded:
+            return recorded
+
+        summaries = [s.get("summary", "") for s in sources if isinstance(s, dict)]
+        return {
+            "task": task,
+            "synthesized_summary": " ".join(summaries)[:600] or "Insufficient evidence.",
+            "core_concepts": [s.get("title", "") for s in sources if isinstance(s, dict)][:3],
+            "strongly_supported_points": [],
+            "weak_or_missing_areas": [] if summaries else ["No sources retrieved"],
+        }
+
+    def create(self, messages, stream=False, **params):
+        kind, answer = self.answer_for(messages)
+        reply = f"<answer>\n{json.dumps(answer, indent=2)}\n</answer>"
+
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        self.counters.record(f"llm:{kind}", prompt_tokens, estimate_tokens(reply))
+
+        # Time to first token, then generation at a fixed token rate
+        self.latency.sleep()
+        usage = _Obj(prompt_tokens=prompt_tokens, completion_tokens=estimate_tokens(reply))
+
+        if not stream:
+            time.sleep(estimate_tokens(reply) / self.tokens_per_second)
+            return _Obj(choices=[_Obj(message=_Obj(content=reply))], usage=usage)
+
+        return self._stream(reply, usage)
+
+    def _stream(self, reply, usage):
+        for start in range(0, len(reply), STREAM_CHUNK_CHARS):
+            chunk = reply[start:start + STREAM_CHUNK_CHARS]
+            time.sleep(estimate_tokens(chunk) / self.tokens_per_second)
+            yield _Obj(choices=[_Obj(delta=_Obj(content=chunk))], usage=None, x_groq=None)
+        yield _Obj(choices=[], usage=None, x_groq=_Obj(usage=usage))
+
+
+class ReplayLLM:
+    # Stands in for the Groq client: client.chat.completions.create(...)
+
+    def __init__(self, index, latency, counters, tokens_per_second=800):
+        self.chat = _Obj(completions=ReplayCompletions(index, latency, counters, tokens_per_second))
+
+
+def prepare_environment(output_path, rate_limits=False):
+    # Must run before any pipeline module is imported: outputs, caches and the run
+    # store go to output_path
+    os.environ["RESEARCH_OUTPUT_PATH"] = output_path
+    os.environ["LLM_CACHE_PATH"] = os.path.join(output_path, "llm_cache.sqlite")
+    os.environ["SEARCH_CACHE_PATH"] = os.path.join(output_path, "search_cache.sqlite")
+    if not rate_limits:
+        for name in ("GROQ_REQUESTS_PER_MINUTE", "GROQ_TOKENS_PER_MINUTE", "TAVILY_REQUESTS_PER_MINUTE"):
+            os.environ[name] = "0"
+
+
+def install(llm_latency="const:0", search_latency="const:0", tokens_per_second=800, seed=0, fixtures=None):
+    # Swaps the fake backends into the already imported pipeline modules
+    from agents import retrieval_agent
+    from utils import llm
+
+    index = ReplayIndex(fixtures if fixtures is not None else load_fixtures())
+    counters = Counters()
+
+    llm.client = ReplayLLM(index, LatencyModel(llm_latency, seed), counters, tokens_per_second)
+    retrieval_agent.tavily = ReplaySearch(index, LatencyModel(search_latency, seed + 1), counters)
+
+    return index, counters
@@ -123,6 +123,7 @@ const CSS = `
 `;
 
 // ─── HELPERS ─────────────────────────────────────────────────────────────────
+const API_BASE = "http://localhost:8000";
 const getPriorityColor = (p) => (p >= 8 ? "#c8f7a0" : p >= 6 ? "#a0d4f7" : "#f7d6a0");
 const pad = (n) => String(n).padStart(2, "0");
 
@@ -135,31 +136,65 @@ export default function App() {
   const [data, setData] = useState(null);
   const [reportTab, setReportTab] = useState("summary");
   const [openCard, setOpenCard] = useState(null);
+  const [liveTasks, setLiveTasks] = useState([]);
 
   const handleRunPipeline = async () => {
     if (!query.trim()) return;
     setLoading(true);
     setView("query");
-    
-    // Simulate pipeline step visual
-    let step = 0;
-    const interval = setInterval(() => {
-      setActiveStep(step);
-      step++;
-      if (step >= AGENTS.length) clearInterval(interval);
-    }, 1500);
+    setActiveStep(0);
+    setLiveTasks([]);
 
     try {
-      const response = await fetch("http://localhost:8000/api/research", {
+      const response = await fetch(`${API_BASE}/api/research`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ query }),
       });
-      const result = await response.json();
+      const job = await response.json();
+      if (!response.ok) throw new Error(job.detail || "Failed to start research job");
+
+      // Stream stage outputs as the backend produces them
+      const result = await new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_BASE}/api/research/${job.job_id}/events`);
+        const trackStage = (e) => {
+          const step = AGENTS.findIndex((a) => a.id === JSON.parse(e.data).stage);
+          if (step >= 0) setActiveStep(step);
+        };
+        source.addEventListener("stage_started", trackStage);
+        source.addEventListener("stage_completed", (e) => {
+          const payload = JSON.parse(e.data);
+          if (payload.stage === "task") setLiveTasks(payload.result.map((t) => ({ description: t.description })));
+        });
+        source.addEventListener("tasks_updated", (e) => {
+          const tasks = JSON.parse(e.data).result;
+          setLiveTasks((prev) => tasks.map((t) => prev.find((p) => p.description === t.description) || { description: t.description }));
+        });
+        source.addEventListener("task_completed", (e) => {
+          const payload = JSON.parse(e.data);
+          if (payload.stage !== "synthesis") return;
+          setLiveTasks((prev) => prev.map((t) => (t.description === payload.task ? { ...t, summary: payload.result.synthesized_summary } : t)));
+        });
+        source.addEventListener("job_completed", (e) => {
+          source.close();
+          resolve(JSON.parse(e.data).result);
+        });
+        source.addEventListener("job_failed", (e) => {
+          source.close();
+          reject(new Error(JSON.parse(e.data).error || "Research pipeline failed"));
+        });
+        // EventSource reconnects on its own; it only gives up (CLOSED) on e.g. a 404 or a non-SSE response
+        source.onerror = () => {
+          if (source.readyState !== EventSource.CLOSED) return;
+          source.close();
+          reject(new Error("Lost the connection to the research event stream"));
+        };
+      });
+
       setData(result);
       setView("report");
     } catch (err) {
-      alert("Pipeline failure: Ensure FastAPI backend is running at localhost:8000");
+      alert(`Pipeline failure: ${err.message}. Ensure FastAPI backend is running at localhost:8000`);
     } finally {
       setLoading(false);
       setActiveStep(-1);
@@ -233,6 +268,16 @@ export default function App() {
                   {loading ? <div className="spinner" /> : "▷ Start Research"}
                 </button>
               </div>
+              {loading && liveTasks.length > 0 && (
+                <div style={{ marginTop: "32px" }}>
+                  {liveTasks.map((task, i) => (
+                    <div key={i} style={{ padding: "12px 0", borderBottom: "1px solid var(--border)" }}>
+                      <div style={{ color: task.summary ? "var(--accent)" : "var(--text-mid)" }}>{pad(i + 1)} — {task.description}</div>
+                      {task.summary && <div style={{ color: "var(--text-dim)", marginTop: "4px" }}>{task.summary}</div>}
+                    </div>
+                  ))}
+                </div>
+              )}
             </div>
           )}
 
@@ -0,0 +1,184 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import env
+from run_pipeline import run_research, run_store, clean_folder_name
+
+MAX_CONCURRENT_JOBS = int(env("MAX_CONCURRENT_JOBS", "2"))
+MAX_FINISHED_JOBS = int(env("MAX_FINISHED_JOBS", "100"))
+# A finished run younger than this is served from the run store instead of rerunning the agents
+RESULT_FRESHNESS_SECONDS = float(env("RESULT_FRESHNESS_SECONDS", "3600"))
+
+STAGES = ["task", "retrieval", "synthesis", "gap", "report"]
+
+
+def load_fresh_results(folder, max_age=RESULT_FRESHNESS_SECONDS):
+    run = run_store.latest_run(folder) if max_age > 0 else None
+    if run is None or time.time() - run["finished_at"] > max_age:
+        return None
+
+    return run_store.load_results(run["id"])
+
+
+class ResearchJob:
+
+    def __init__(self, query):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.key = clean_folder_name(query)
+        self.cached = False
+        self.run_id = None
+        self.status = "queued"
+        self.stage = None
+        self.iteration = 0
+        self.stages = {
+            stage: {"status": "pending", "completed": 0, "total": None}
+            for stage in STAGES
+        }
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self._lock = threading.Lock()
+        # Called from the pipeline thread after each new event; stream subscribers hand it to their event loop
+        self._subscribers = []
+
+    def handle_event(self, event, data):
+        with self._lock:
+            self.events.append({"event": event, **data})
+
+            if event == "run_started":
+                self.run_id = data["run_id"]
+            elif event == "iteration_started":
+                self.iteration = data["iteration"]
+            elif event == "stage_started":
+                stage = self.stages[data["stage"]]
+                stage.update(status="running", completed=0, total=data.get("total"))
+                self.stage = data["stage"]
+            elif event == "stage_completed":
+                self.stages[data["stage"]]["status"] = "completed"
+            elif event == "task_completed":
+                self.stages[data["stage"]]["completed"] += 1
+            elif event == "job_completed":
+                # Finished only together with the terminal event, so a stream never sees one without the other
+                self.status = "completed"
+            elif event == "job_failed":
+                self.status = "failed"
+
+            subscribers = list(self._subscribers)
+
+        for notify in subscribers:
+            notify()
+
+    def is_finished(self):
+        return self.status in ("completed", "failed")
+
+    def subscribe(self, notify):
+        with self._lock:
+            self._subscribers.append(notify)
+
+    def unsubscribe(self, notify):
+        with self._lock:
+            if notify in self._subscribers:
+                self._subscribers.remove(notify)
+
+    def events_since(self, cursor):
+        with self._lock:
+            return self.events[cursor:]
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "query": self.query,
+                "status": self.status,
+                "cached": self.cached,
+                "run_id": self.run_id,
+                "stage": self.stage,
+                "iteration": self.iteration,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+
+    def __init__(self, max_workers=MAX_CONCURRENT_JOBS, freshness=RESULT_FRESHNESS_SECONDS):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="research-job")
+        self.freshness = freshness
+        self.jobs = {}
+        self.in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, query):
+        job = ResearchJob(query)
+
+        with self._lock:
+            # Queries that map to the same output folder share one run
+            existing = self.in_flight.get(job.key)
+            if existing is not None:
+                print(f"Attaching to in-flight research job {existing.id} for '{job.key}'")
+                return existing
+
+            fresh_result = load_fresh_results(job.key, self.freshness)
+
+            self.jobs[job.id] = job
+            self._prune()
+
+            if fresh_result is not None:
+                print(f"Serving fresh results for '{job.key}' from the run store")
+                job.cached = True
+                job.result = fresh_result
+                job.started_at = job.finished_at = time.time()
+                job.handle_event("job_completed", {"result": fresh_result})
+                return job
+
+            self.in_flight[job.key] = job
+
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = "running"
+        job.started_at = time.time()
+
+        try:
+            report_path = run_research(job.query, on_event=job.handle_event)
+            result = run_store.load_results(job.run_id) if report_path else None
+
+            if result is None:
+                raise RuntimeError("Research pipeline failed to generate results.")
+
+            job.result = result
+            job.finished_at = time.time()
+            job.handle_event("job_completed", {"result": result})
+        except Exception as e:
+            print(f"Error during research job {job.id}: {e}")
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.handle_event("job_failed", {"error": job.error})
+        finally:
+            with self._lock:
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]
+
+    def _prune(self):
+        finished = sorted(
+            (job for job in self.jobs.values() if job.is_finished()),
+            key=lambda job: job.finished_at
+        )
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,12 +1,18 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import threading
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import os
-import json
-# Import the existing pipeline logic
-from run_pipeline import run_research, BASE_PATH, clean_folder_name 
+# Research runs execute in a background worker pool so the event loop stays free
+from jobs import JobManager
+from run_pipeline import BASE_PATH, run_store
+from utils import http_pool, llm, metrics
+from utils.config import env
 
 app = FastAPI()
+job_manager = JobManager()
 
 # Enhanced CORS Configuration
 app.add_middleware(
@@ -17,44 +23,159 @@ app.add_middleware(
     allow_headers=["*"],  # Allows Content-Type, Authorization, etc.
 )
 
+# How long an idle event stream waits before sending a keep-alive comment
+SSE_KEEPALIVE_SECONDS = 15
+
 class ResearchRequest(BaseModel):
     query: str
 
-@app.post("/api/research")
+@app.on_event("startup")
+def import_legacy_runs():
+    # Output folders written before the run store existed become queryable runs
+    imported = run_store.import_folders(BASE_PATH)
+    if imported:
+        print(f"Imported {len(imported)} existing research folders into the run store")
+
+@app.on_event("startup")
+def warm_clients():
+    # Builds the Groq client off the startup path so the first job does not pay for it.
+    # Without a key there is nothing to build; the first job reports the missing key.
+    if not env("GROQ_API_KEY"):
+        return
+
+    def build():
+        try:
+            llm.get_client()
+        except Exception as e:
+            print(f"Groq client not ready: {e}")
+
+    threading.Thread(target=build, daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_jobs():
+    job_manager.shutdown()
+    http_pool.close()
+    await http_pool.aclose()
+
+@app.post("/api/research", status_code=202)
 async def start_research(request: ResearchRequest):
-    try:
-        # Trigger the autonomous research process
-        run_research(request.query)
-        
-        # Determine the directory based on the query sanitization logic
-        folder_name = clean_folder_name(request.query)
-        folder_path = os.path.join(BASE_PATH, folder_name)
-        
-        # Load the outputs from the specialized agents
-        report_path = os.path.join(folder_path, "final_report.json")
-        tasks_path = os.path.join(folder_path, "tasks.json")
-        synthesis_path = os.path.join(folder_path, "synthesis_results.json")
-
-        if not os.path.exists(report_path):
-            raise HTTPException(status_code=500, detail="Research pipeline failed to generate results.")
-
-        with open(report_path, "r") as f:
-            report_data = json.load(f)
-        with open(tasks_path, "r") as f:
-            tasks_data = json.load(f)
-        with open(synthesis_path, "r") as f:
-            synthesis_data = json.load(f)
-
-        return {
-            "tasks": tasks_data,
-            "synthesis": synthesis_data,
-            "report": report_data
-        }
-    except Exception as e:
-        print(f"Error during research: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    if not request.query or not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+
+    # Queue the autonomous research process and hand back a job id to poll
+    job = job_manager.submit(request.query.strip())
+    return job.to_dict()
+
+@app.get("/api/research/{job_id}")
+async def get_research_status(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown research job.")
+
+    return job.to_dict()
+
+@app.get("/api/research/{job_id}/result")
+async def get_research_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown research job.")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Research job is {job.status}.")
+
+    return job.result
+
+@app.get("/api/research/{job_id}/events")
+async def stream_research_events(job_id: str, request: Request):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown research job.")
+
+    # Resume after the last event a reconnecting EventSource already received
+    last_event_id = request.headers.get("last-event-id")
+    cursor = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def event_stream():
+        nonlocal cursor
+        # The pipeline thread wakes this subscriber through the loop instead of a thread blocking per wait
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                # The loop already shut down; nobody is listening any more
+                pass
+
+        job.subscribe(notify)
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+
+                # Cleared before reading so an event landing in between still wakes the wait below.
+                # Finished is checked first: the terminal event is in by the time it reads true.
+                changed.clear()
+                finished = job.is_finished()
+                events = job.events_since(cursor)
+
+                if not events:
+                    if finished:
+                        break
+                    try:
+                        await asyncio.wait_for(changed.wait(), SSE_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                    continue
+
+                for event in events:
+                    payload = {key: value for key, value in event.items() if key != "event"}
+                    yield f"id: {cursor}\nevent: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+                    cursor += 1
+
+                if events[-1]["event"] in ("job_completed", "job_failed"):
+                    break
+        finally:
+            job.unsubscribe(notify)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/runs")
+async def list_runs(q: str = None, url: str = None, limit: int = 50):
+    limit = max(1, min(limit, 500))
+    # Cross-run lookup: every run that extracted facts from this source URL
+    if url:
+        return run_store.runs_citing(url, limit=limit)
+    return run_store.list_runs(query=q, limit=limit)
+
+@app.get("/api/runs/{run_id}")
+async def get_run(run_id: int):
+    run = run_store.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Unknown research run.")
+
+    return {**run, "results": run_store.load_results(run_id)}
+
+@app.get("/api/runs/{run_id}/trace")
+async def get_run_trace(run_id: int):
+    trace = run_store.load_output(run_id, "trace")
+    if trace is None:
+        raise HTTPException(status_code=404, detail="No trace recorded for this run.")
+
+    return trace
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus scrape endpoint for stage, task and provider call timings
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
     # Run the server on the expected port 8000
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
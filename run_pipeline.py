@@ -1,19 +1,60 @@
 import os
 import json
 import re
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import env
 from agents.task_agent import generate_tasks
-from agents.retrieval_agent import retrieve
-from agents.synthesis_agent import synthesize
+from agents.retrieval_agent import (
+    retrieve,
+    retrieve_tasks,
+    save_retrieval_results,
+    RETRIEVAL_MAX_WORKERS,
+    SEARCH_DEPTH,
+    SEARCH_MAX_RESULTS,
+)
+from agents.synthesis_agent import (
+    synthesize,
+    synthesize_batch,
+    batch_tasks,
+    save_synthesis_results,
+    is_synthesized,
+    SYNTHESIS_BATCHED,
+    SYNTHESIS_MAX_BATCH_TASKS,
+)
 from agents.gap_agent import detect_gaps
 from agents.report_agent import generate_report
-
-load_dotenv()
-
-BASE_PATH = os.path.join(os.path.dirname(__file__), "model_output_data")
-MAX_ITERATIONS = 2
+from utils.convergence import ConvergenceController
+from utils.load_json import load_json
+from utils.http_pool import connection_stats
+from utils.llm import cache_stats
+from utils.metrics import RUNS
+from utils.passage_ranker import RETRIEVAL_TASK_TOKEN_BUDGET
+from utils.run_manifest import RunManifest, input_hash
+from utils.run_store import RunStore
+from utils.scheduler import scheduler
+from utils.similarity import MinHashLSH, tokenize
+from utils.task_memory import TaskMemory
+from utils.tracing import current_trace, in_context, trace_run
+
+
+BASE_PATH = env("RESEARCH_OUTPUT_PATH", os.path.join(os.path.dirname(__file__), "model_output_data"))
+RUN_STORE_PATH = env("RUN_STORE_PATH", os.path.join(BASE_PATH, "research_runs.sqlite"))
+MAX_ITERATIONS = int(env("MAX_ITERATIONS", "2"))
 MAX_TOTAL_TASKS = 8
 MAX_NEW_TASKS_PER_ITER = 2
+# Stream each task from retrieval straight into synthesis instead of
+# waiting for the whole retrieval stage to finish first
+PIPELINED_STAGES = True
+# Carry over tasks already retrieved and synthesized in an earlier
+# iteration so only gap-agent additions hit Tavily and Groq again
+INCREMENTAL_ITERATIONS = True
+# Gap tasks whose word sets overlap an existing task by at least this Jaccard score are skipped
+TASK_SIMILARITY_THRESHOLD = float(env("TASK_SIMILARITY_THRESHOLD", "0.5"))
+# Tasks this close to one already researched in any past run reuse its results
+TASK_REUSE_THRESHOLD = float(env("TASK_REUSE_THRESHOLD", "0.85"))
+TASK_REUSE_MAX_AGE = float(env("TASK_REUSE_MAX_AGE", str(7 * 24 * 60 * 60)))
+# Earlier queries this similar to a new one seed the task agent's research context
+QUERY_MATCH_THRESHOLD = float(env("QUERY_MATCH_THRESHOLD", "0.6"))
 BLOCKED_KEYWORDS = [
     "comprehensive",
     "assessment",
@@ -31,14 +72,98 @@ def clean_folder_name(text):
     return text[:80]
 
 
-def is_similar(new_desc, existing_tasks):
-    new_words = set(new_desc.lower().split())
-    for task in existing_tasks:
-        existing_words = set(task.lower().split())
-        overlap = len(new_words & existing_words)
-        if overlap >= 4:
-            return True
-    return False
+task_memory = TaskMemory(BASE_PATH, max_age=TASK_REUSE_MAX_AGE)
+run_store = RunStore(RUN_STORE_PATH)
+
+# Stage names used in pipeline events mapped to the run store's output kinds
+STORED_STAGES = {
+    "task": "tasks",
+    "retrieval": "retrieval",
+    "synthesis": "synthesis",
+    "gap": "gap",
+    "report": "report",
+}
+
+
+def build_task_index(descriptions):
+    index = MinHashLSH()
+    for desc in descriptions:
+        index.add(desc, tokenize(desc))
+    return index
+
+
+def is_similar(new_desc, task_index):
+    return bool(task_index.query(tokenize(new_desc), TASK_SIMILARITY_THRESHOLD))
+
+
+def recall_task_results(task_descriptions, folder_name=None):
+    # Looks up each task in past runs and returns {task: (sources, synthesis)}
+    # for those whose closest earlier match already has usable results.
+    # The query's own folder is skipped: its old results are what a re-run replaces.
+    if TASK_REUSE_THRESHOLD <= 0 or TASK_REUSE_THRESHOLD > 1:
+        return {}
+
+    task_memory.refresh()
+    recalled = {}
+    loaded = {}
+
+    for task_description in task_descriptions:
+        for score, folder, matched in task_memory.find_tasks(task_description, TASK_REUSE_THRESHOLD, exclude_folder=folder_name):
+            if folder not in loaded:
+                folder_path = os.path.join(BASE_PATH, folder)
+                loaded[folder] = (
+                    load_json(os.path.join(folder_path, "retrieval_results.json"), {}),
+                    load_json(os.path.join(folder_path, "synthesis_results.json"), {})
+                )
+
+            retrieval_data, synthesis_data = loaded[folder]
+            synthesis = synthesis_data.get(matched)
+
+            if matched in retrieval_data and is_synthesized(synthesis):
+                print(f"Reusing results of '{matched}' from {folder} ({score:.2f} similar)")
+                recalled[task_description] = (retrieval_data[matched], {**synthesis, "task": task_description})
+                break
+
+    return recalled
+
+
+def retrieval_inputs(task_description):
+    return input_hash(task_description, SEARCH_DEPTH, SEARCH_MAX_RESULTS, RETRIEVAL_TASK_TOKEN_BUDGET)
+
+
+def synthesis_inputs(task_description, task_sources):
+    return input_hash(task_description, task_sources)
+
+
+def checkpointed_results(manifest, task_descriptions):
+    # Per-task sources and syntheses an interrupted run of this query already
+    # finished, as long as their inputs are unchanged
+    sources = {}
+    syntheses = {}
+    if manifest is None:
+        return sources, syntheses
+
+    for task_description in task_descriptions:
+        unit = manifest.lookup("retrieval", retrieval_inputs(task_description), task_description)
+        if unit is None:
+            continue
+        sources[task_description] = unit["result"]
+
+        unit = manifest.lookup("synthesis", synthesis_inputs(task_description, unit["result"]), task_description)
+        if unit is not None:
+            syntheses[task_description] = unit["result"]
+
+    return sources, syntheses
+
+
+def checkpoint_task(manifest, stage, task_description, task_sources, synthesis=None):
+    # Empty retrievals and failed syntheses are left out so a resumed run tries them again
+    if manifest is None:
+        return
+    if stage == "retrieval" and task_sources:
+        manifest.complete("retrieval", retrieval_inputs(task_description), task_description, result=task_sources)
+    elif stage == "synthesis" and is_synthesized(synthesis):
+        manifest.complete("synthesis", synthesis_inputs(task_description, task_sources), task_description, result=synthesis)
 
 
 def is_blocked(desc):
@@ -46,7 +171,246 @@ def is_blocked(desc):
     return any(word in desc_lower for word in BLOCKED_KEYWORDS)
 
 
-def run_research(user_query):
+def emit(on_event, event, **data):
+    if on_event:
+        on_event(event, data)
+
+
+def retrieve_and_synthesize(tasks_file_path, max_workers=RETRIEVAL_MAX_WORKERS, incremental=False, on_event=None,
+                            manifest=None, batched=None):
+    with open(tasks_file_path, "r") as f:
+        tasks = json.load(f)
+
+    working_folder = os.path.dirname(tasks_file_path)
+    task_descriptions = [task["description"] for task in tasks]
+
+    existing_retrieval = {}
+    existing_synthesis = {}
+    if incremental:
+        existing_retrieval = load_json(os.path.join(working_folder, "retrieval_results.json"), {})
+        existing_synthesis = load_json(os.path.join(working_folder, "synthesis_results.json"), {})
+
+    checkpoint_sources, checkpoint_syntheses = checkpointed_results(manifest, task_descriptions)
+    for task_description, synthesis in checkpoint_syntheses.items():
+        existing_retrieval[task_description] = checkpoint_sources[task_description]
+        existing_synthesis[task_description] = synthesis
+
+    def is_done(task_description):
+        return (
+            task_description in existing_retrieval
+            and is_synthesized(existing_synthesis.get(task_description))
+        )
+
+    pending = [d for d in task_descriptions if not is_done(d)]
+
+    # Tasks already researched in a past run are answered from task memory
+    recalled = recall_task_results(pending, folder_name=os.path.basename(working_folder))
+    for task_description, (task_sources, synthesis) in recalled.items():
+        existing_retrieval[task_description] = task_sources
+        existing_synthesis[task_description] = synthesis
+    pending = [d for d in pending if d not in recalled]
+
+    # Tasks whose sources were checkpointed before an interruption only need synthesizing
+    retrieved = {d: checkpoint_sources[d] for d in pending if d in checkpoint_sources}
+    to_retrieve = [d for d in pending if d not in retrieved]
+
+    if incremental or recalled or checkpoint_sources:
+        print(f"Researching {len(pending)} new task(s), reusing {len(task_descriptions) - len(pending)}")
+
+    emit(on_event, "stage_started", stage="retrieval", total=len(to_retrieve))
+    emit(on_event, "stage_started", stage="synthesis", total=len(pending))
+
+    if batched is None:
+        batched = SYNTHESIS_BATCHED
+
+    def synthesize_and_emit(task_items):
+        results = synthesize_batch(task_items)
+        for task_description, synthesis in results.items():
+            checkpoint_task(manifest, "synthesis", task_description, task_items[task_description], synthesis)
+            emit(on_event, "task_completed", stage="synthesis", task=task_description, result=synthesis)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as synthesis_executor:
+        synthesis_futures = {}
+        # Retrieved tasks waiting for enough company to fill a synthesis batch
+        waiting = {}
+
+        def submit_synthesis(task_items):
+            future = synthesis_executor.submit(in_context(synthesize_and_emit), task_items)
+            for task_description in task_items:
+                synthesis_futures[task_description] = future
+
+        # Each task's synthesis starts as soon as all of its sources are extracted,
+        # or in batched mode as soon as it completes a batch
+        def queue_synthesis(task_description, task_sources):
+            if not batched:
+                submit_synthesis({task_description: task_sources})
+                return
+
+            waiting[task_description] = task_sources
+            batches = batch_tasks(waiting)
+            full = batches if len(batches[-1]) >= SYNTHESIS_MAX_BATCH_TASKS else batches[:-1]
+            for batch in full:
+                submit_synthesis({d: waiting.pop(d) for d in batch})
+
+        for task_description, task_sources in retrieved.items():
+            queue_synthesis(task_description, task_sources)
+
+        def on_task_retrieved(task_description, task_sources):
+            checkpoint_task(manifest, "retrieval", task_description, task_sources)
+            emit(on_event, "task_completed", stage="retrieval", task=task_description, result=task_sources)
+            queue_synthesis(task_description, task_sources)
+
+        new_retrieval = retrieve_tasks(to_retrieve, max_workers=max_workers, on_task_done=on_task_retrieved)
+
+        if waiting:
+            submit_synthesis(dict(waiting))
+
+        all_sources = {**existing_retrieval, **retrieved, **new_retrieval}
+        retrieval_results = {task_description: all_sources[task_description] for task_description in task_descriptions}
+        # Retrieval is over once the last sources are in, even while syntheses are still running
+        emit(on_event, "stage_completed", stage="retrieval", result=retrieval_results)
+
+        synthesized_results = {
+            task_description: synthesis_futures[task_description].result()[task_description]
+            if task_description in synthesis_futures else existing_synthesis[task_description]
+            for task_description in task_descriptions
+        }
+
+    retrieval_path = save_retrieval_results(retrieval_results, working_folder)
+    synthesis_path = save_synthesis_results(synthesized_results, working_folder)
+
+    return retrieval_path, synthesis_path
+
+
+def stage_files(working_folder, incremental):
+    # The stage outputs a staged run continues from; none before its first incremental pass
+    if not incremental:
+        return {}, {}
+    return (
+        load_json(os.path.join(working_folder, "retrieval_results.json"), {}),
+        load_json(os.path.join(working_folder, "synthesis_results.json"), {})
+    )
+
+
+def write_stage_files(sources, syntheses, working_folder, incremental):
+    retrieval_results, synthesis_results = stage_files(working_folder, incremental)
+    retrieval_results.update(sources)
+    synthesis_results.update(syntheses)
+
+    save_retrieval_results(retrieval_results, working_folder)
+    save_synthesis_results(synthesis_results, working_folder)
+
+
+def restore_checkpoints(manifest, task_descriptions, working_folder, incremental):
+    # The staged agents only skip work found in their output files, so checkpointed
+    # results are written back there before they run. Returns whether any were.
+    sources, syntheses = checkpointed_results(manifest, task_descriptions)
+    if not sources:
+        return False
+
+    write_stage_files(sources, syntheses, working_folder, incremental)
+    print(f"Restored {len(sources)} checkpointed task(s)")
+    return True
+
+
+def restore_recalled(task_descriptions, working_folder, incremental):
+    # Same for tasks answered from task memory. Returns whether any were.
+    retrieval_results, synthesis_results = stage_files(working_folder, incremental)
+    pending = [
+        d for d in task_descriptions
+        if d not in retrieval_results or not is_synthesized(synthesis_results.get(d))
+    ]
+
+    recalled = recall_task_results(pending, folder_name=os.path.basename(working_folder))
+    if not recalled:
+        return False
+
+    write_stage_files(
+        {d: task_sources for d, (task_sources, _) in recalled.items()},
+        {d: synthesis for d, (_, synthesis) in recalled.items()},
+        working_folder,
+        incremental
+    )
+    return True
+
+
+def related_research_context(user_query, folder_name):
+    task_memory.refresh()
+    matches = task_memory.find_query(user_query, QUERY_MATCH_THRESHOLD, exclude_folder=folder_name)
+
+    if not matches:
+        return "Starting fresh research"
+
+    score, folder = matches[0]
+    past_tasks = task_memory.folder_tasks(folder)
+    print(f"Related past research: {folder} ({score:.2f} similar)")
+
+    return (
+        f"Related earlier research on \"{folder.replace('_', ' ')}\" covered these tasks: "
+        + "; ".join(past_tasks)
+        + ". Reuse any of them verbatim where they fit this query."
+    )
+
+
+def store_events(run_id, on_event=None):
+    # Records every stage output of a run in the run store, then forwards the event
+    iteration = 0
+
+    def handle(event, data):
+        nonlocal iteration
+
+        if event == "iteration_started":
+            iteration = data["iteration"]
+            run_store.start_iteration(run_id, iteration)
+        elif event == "stage_completed" and data.get("result") is not None:
+            run_store.save_output(run_id, STORED_STAGES[data["stage"]], data["result"], iteration)
+        elif event == "tasks_updated":
+            run_store.save_output(run_id, "tasks", data["result"], iteration)
+
+        emit(on_event, event, **data)
+
+    return handle
+
+
+def trace_events(trace, on_event=None):
+    # Opens a "stage" span on stage_started and closes it on stage_completed
+    open_stages = {}
+    root = trace.spans[0]["id"]
+    iteration = 0
+
+    def handle(event, data):
+        nonlocal iteration
+
+        if event == "iteration_started":
+            iteration = data["iteration"]
+        elif event == "stage_started":
+            open_stages[data["stage"]] = trace.start(data["stage"], "stage", parent=root, iteration=iteration)
+        elif event == "stage_completed" and data["stage"] in open_stages:
+            trace.finish(open_stages.pop(data["stage"]))
+
+        emit(on_event, event, **data)
+
+    def close():
+        # Stages still open when the run ends are the ones it stopped in
+        for stage in open_stages.values():
+            stage["attrs"]["completed"] = False
+            trace.finish(stage)
+        open_stages.clear()
+
+    return handle, close
+
+
+def save_trace(trace, run_id, folder_path):
+    trace_data = trace.to_dict()
+
+    with open(os.path.join(folder_path, "trace.json"), "w") as f:
+        json.dump(trace_data, f, indent=2)
+
+    run_store.save_output(run_id, "trace", trace_data)
+
+
+def run_research(user_query, on_event=None):
     if not user_query or not user_query.strip():
         print("Error: Query cannot be empty.")
         return
@@ -59,10 +423,53 @@ def run_research(user_query):
     folder_path = os.path.join(BASE_PATH, folder_name)
     os.makedirs(folder_path, exist_ok=True)
 
+    run_id = run_store.start_run(user_query, folder_name)
+    emit(on_event, "run_started", run_id=run_id)
+
+    # An unfinished run of the same query left checkpoints behind: continue from them
+    manifest = RunManifest(folder_path)
+    previous = manifest.resume(user_query, run_id)
+    if previous:
+        interrupted = run_store.get_run(previous["run_id"]) if previous.get("run_id") else None
+        if interrupted and interrupted["status"] == "running":
+            run_store.finish_run(previous["run_id"], "interrupted")
+        print(f"Resuming an unfinished run from {manifest.unit_count()} checkpointed unit(s)")
+        emit(on_event, "run_resumed", units=manifest.unit_count(), iteration=previous.get("iteration", 0))
+
+    report_path = None
+    try:
+        with trace_run(run_id, query=user_query, resumed=bool(previous)) as trace:
+            on_stage_event, close_stages = trace_events(trace, store_events(run_id, on_event))
+            try:
+                report_path = research_loop(user_query, folder_name, folder_path, on_stage_event, manifest)
+            finally:
+                close_stages()
+        return report_path
+    finally:
+        # Saved after the run span has closed so the trace includes its duration
+        status = "completed" if report_path else "failed"
+        save_trace(trace, run_id, folder_path)
+        manifest.finish(status)
+        RUNS.inc(status=status)
+        run_store.finish_run(run_id, status)
+
+
+def research_loop(user_query, folder_name, folder_path, on_event=None, manifest=None):
     # --- Step 1: Generate tasks ---
     # generate_tasks() returns a file path to tasks.json
-    print("Generating tasks...")
-    tasks_file_path = generate_tasks(user_query, research_context="Starting fresh research")
+    emit(on_event, "stage_started", stage="task")
+    task_inputs = input_hash(user_query)
+    checkpoint = manifest.lookup("task", task_inputs) if manifest else None
+
+    if checkpoint:
+        # Includes any tasks the gap agent added before the interruption
+        print("Resuming with the saved task list...")
+        tasks_file_path = os.path.join(folder_path, checkpoint["file"])
+    else:
+        print("Generating tasks...")
+        tasks_file_path = generate_tasks(
+            user_query, research_context=related_research_context(user_query, folder_name), output_folder=folder_path
+        )
 
     if not tasks_file_path or not os.path.exists(tasks_file_path):
         print("No tasks generated. Exiting.")
@@ -75,48 +482,145 @@ def run_research(user_query):
         print("Task list is empty. Exiting.")
         return
 
+    if manifest and not checkpoint:
+        manifest.complete("task", task_inputs, file=tasks_file_path)
+
+    # Tasks the gap agent added at the end of the interrupted iteration are added again when it is replayed
+    iteration_tasks = manifest.data.get("iteration_tasks") if checkpoint else None
+    if iteration_tasks and len(iteration_tasks) < len(tasks):
+        tasks = [t for t in tasks if t["description"] in set(iteration_tasks)]
+        with open(tasks_file_path, "w") as f:
+            json.dump(tasks, f, indent=4)
+
+    emit(on_event, "stage_completed", stage="task", result=tasks)
+
     # Track the working folder (derived from tasks_file_path)
     working_folder = os.path.dirname(tasks_file_path)
 
-    for iteration in range(MAX_ITERATIONS):
+    trace = current_trace()
+    controller = ConvergenceController(token_usage=trace.tokens_used if trace else None)
+
+    # A resumed run picks up in the iteration it was interrupted in
+    first_iteration = max(0, manifest.data.get("iteration", 0) - 1) if manifest else 0
+
+    for iteration in range(first_iteration, MAX_ITERATIONS):
         print(f"\n--- Iteration {iteration + 1} ---")
+        emit(on_event, "iteration_started", iteration=iteration + 1)
+        if manifest:
+            manifest.set_iteration(iteration + 1, [t["description"] for t in tasks])
+
+        # Outputs on disk before the first iteration belong to an older run
+        incremental = INCREMENTAL_ITERATIONS and iteration > 0
+
+        if PIPELINED_STAGES:
+            # --- Steps 2 & 3: Retrieve and synthesize each task as one stream ---
+            print("Retrieving and synthesizing per task...")
+            retrieval_path, synthesis_path = retrieve_and_synthesize(
+                tasks_file_path, incremental=incremental, on_event=on_event, manifest=manifest
+            )
+
+            if not retrieval_path or not os.path.exists(retrieval_path):
+                print("Retrieval failed. Stopping.")
+                break
+        else:
+            # --- Step 2: Retrieve ---
+            print("Retrieving sources...")
+            task_descriptions = [t["description"] for t in tasks]
+            if restore_checkpoints(manifest, task_descriptions, working_folder, incremental):
+                incremental = True
+            # Tasks already researched in a past run are answered from task memory
+            if restore_recalled(task_descriptions, working_folder, incremental):
+                incremental = True
+
+            retrieved, synthesized = stage_files(working_folder, incremental)
+            emit(on_event, "stage_started", stage="retrieval",
+                 total=len([d for d in task_descriptions if d not in retrieved]))
+
+            def on_task_retrieved(task_description, task_sources):
+                checkpoint_task(manifest, "retrieval", task_description, task_sources)
+                emit(on_event, "task_completed", stage="retrieval", task=task_description, result=task_sources)
+
+            retrieval_path = retrieve(tasks_file_path, incremental=incremental, on_task_done=on_task_retrieved)
+
+            if not retrieval_path or not os.path.exists(retrieval_path):
+                print("Retrieval failed. Stopping.")
+                break
 
-        # --- Step 2: Retrieve ---
-        print("Retrieving sources...")
-        retrieval_path = retrieve(tasks_file_path)
+            retrieval_results = load_json(retrieval_path, {})
+            emit(on_event, "stage_completed", stage="retrieval", result=retrieval_results)
 
-        if not retrieval_path or not os.path.exists(retrieval_path):
-            print("Retrieval failed. Stopping.")
-            break
+            # --- Step 3: Synthesize ---
+            print("Synthesizing findings...")
+            emit(on_event, "stage_started", stage="synthesis",
+                 total=len([d for d in retrieval_results if not is_synthesized(synthesized.get(d))]))
+
+            def on_task_synthesized(task_description, synthesis):
+                checkpoint_task(manifest, "synthesis", task_description, retrieval_results[task_description], synthesis)
+                emit(on_event, "task_completed", stage="synthesis", task=task_description, result=synthesis)
 
-        # --- Step 3: Synthesize ---
-        print("Synthesizing findings...")
-        synthesis_path = synthesize(retrieval_path)
+            synthesis_path = synthesize(retrieval_path, incremental=incremental, on_task_done=on_task_synthesized)
 
         if not synthesis_path or not os.path.exists(synthesis_path):
             print("Synthesis failed. Stopping.")
             break
 
+        emit(on_event, "stage_completed", stage="synthesis", result=load_json(synthesis_path))
+
+        gain = controller.observe(load_json(retrieval_path, {}), load_json(synthesis_path, {}))
+        emit(on_event, "iteration_gain", iteration=iteration + 1, **gain)
+
+        # Later iterations can fall back on the previous gap results, so their gap pass is optional
+        if iteration > 0:
+            stop_reason = controller.budget_exhausted()
+            if controller.converged():
+                stop_reason = (
+                    f"converged (+{gain['new_urls']} sources, +{gain['new_concepts']} concepts, "
+                    f"{gain['weak_areas_closed']} weak areas closed)"
+                )
+            if stop_reason:
+                print(f"Stopping after iteration {iteration + 1}: {stop_reason}. Skipping gap detection.")
+                emit(on_event, "iteration_stopped", iteration=iteration + 1, reason=stop_reason)
+                break
+
         # --- Step 4: Detect gaps ---
-        print("Detecting gaps...")
-        gap_path = detect_gaps(synthesis_path)
+        emit(on_event, "stage_started", stage="gap")
+        gap_inputs = input_hash(load_json(synthesis_path, {}))
+        checkpoint = manifest.lookup("gap", gap_inputs) if manifest else None
+
+        if checkpoint:
+            print("Reusing gap results of the unchanged syntheses...")
+            gap_path = os.path.join(working_folder, checkpoint["file"])
+        else:
+            print("Detecting gaps...")
+            gap_path = detect_gaps(synthesis_path)
 
         if not gap_path or not os.path.exists(gap_path):
             print("Gap detection failed. Stopping.")
             break
 
+        if manifest and not checkpoint:
+            manifest.complete("gap", gap_inputs, file=gap_path)
+
         # Load gap results to check for new tasks
         with open(gap_path, "r") as f:
             gap_result = json.load(f)
 
+        emit(on_event, "stage_completed", stage="gap", result=gap_result)
+
         new_tasks_suggested = gap_result.get("suggested_new_tasks", [])
 
         if not new_tasks_suggested:
             print("No new tasks suggested. Stopping iterations.")
             break
 
+        stop_reason = controller.budget_exhausted()
+        if stop_reason:
+            print(f"Stopping iterations: {stop_reason}.")
+            emit(on_event, "iteration_stopped", iteration=iteration + 1, reason=stop_reason)
+            break
+
         # Filter and append valid new tasks
-        existing_descriptions = [t["description"] for t in tasks]
+        task_index = build_task_index(t["description"] for t in tasks)
         appended_count = 0
 
         for t in new_tasks_suggested:
@@ -132,7 +636,7 @@ def run_research(user_query):
             if is_blocked(desc):
                 print(f"Blocked task: {desc}")
                 continue
-            if is_similar(desc, existing_descriptions):
+            if is_similar(desc, task_index):
                 print(f"Similar task skipped: {desc}")
                 continue
 
@@ -141,7 +645,7 @@ def run_research(user_query):
                 "priority": int(round(t.get("priority", 5))),
                 "type": "research"
             })
-            existing_descriptions.append(desc)
+            task_index.add(desc, tokenize(desc))
             appended_count += 1
             print(f"New task added: {desc}")
 
@@ -153,6 +657,8 @@ def run_research(user_query):
         with open(tasks_file_path, "w") as f:
             json.dump(tasks, f, indent=4)
 
+        emit(on_event, "tasks_updated", result=tasks)
+
     # --- Step 5: Generate final report ---
     # Ensure synthesis and gap files exist from the last iteration
     synthesis_path = os.path.join(working_folder, "synthesis_results.json")
@@ -162,12 +668,30 @@ def run_research(user_query):
         print("Missing synthesis or gap files. Cannot generate report.")
         return
 
-    print("\nGenerating final report...")
-    report_path = generate_report(synthesis_path, gap_path)
+    emit(on_event, "stage_started", stage="report")
+    report_inputs = input_hash(load_json(synthesis_path, {}), load_json(gap_path, {}))
+    checkpoint = manifest.lookup("report", report_inputs) if manifest else None
+
+    if checkpoint:
+        print("\nReusing the final report of the unchanged results...")
+        report_path = os.path.join(working_folder, checkpoint["file"])
+    else:
+        print("\nGenerating final report...")
+        report_path = generate_report(synthesis_path, gap_path)
+        if manifest and report_path and os.path.exists(report_path):
+            manifest.complete("report", report_inputs, file=report_path)
 
     if report_path and os.path.exists(report_path):
+        emit(on_event, "stage_completed", stage="report", result=load_json(report_path))
         print("Research complete.")
         print("Report saved to:", report_path)
+        for agent, stats in cache_stats().items():
+            print(f"LLM cache [{agent}]: {stats['hits']} hit(s), {stats['misses']} miss(es)")
+        for host, stats in connection_stats().items():
+            print(f"HTTP [{host}]: {stats['requests']} request(s), {stats['connections']} connection(s), {stats['reused']} reused")
+        for provider, stats in scheduler.stats().items():
+            print(f"Scheduler [{provider}]: {stats['requests']} request(s), {stats['retries']} retried, waited {stats['wait_seconds']:.1f}s for quota")
+        return report_path
     else:
         print("Report generation failed.")
 
@@ -0,0 +1,32 @@
+import os
+
+_loaded = False
+
+
+def load_config():
+    # Reads .env once per process; variables already set in the environment win
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def env(name, default=None):
+    load_config()
+    return os.getenv(name, default)
+
+
+def env_flag(name, default=False):
+    # Boolean setting: 1/true/yes/on and 0/false/no/off, anything else keeps the default
+    value = (env(name) or "").strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return default
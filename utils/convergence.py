@@ -0,0 +1,95 @@
+import re
+import time
+from utils.config import env
+
+# An iteration that adds less than this fraction of new sources and concepts,
+# without closing any weak areas, is treated as converged
+CONVERGENCE_MIN_GAIN = float(env("CONVERGENCE_MIN_GAIN", "0.15"))
+# Per-run budgets; 0 disables them
+RUN_TIME_BUDGET_SECONDS = float(env("RUN_TIME_BUDGET_SECONDS", "0"))
+RUN_TOKEN_BUDGET = int(env("RUN_TOKEN_BUDGET", "0"))
+
+
+def normalize_term(text):
+    return re.sub(r"[^a-z0-9]+", " ", str(text).lower()).strip()
+
+
+def source_urls(retrieval_results):
+    urls = set()
+    for items in retrieval_results.values():
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and item.get("source"):
+                urls.add(str(item["source"]).strip().lower().rstrip("/"))
+    return urls
+
+
+def synthesis_terms(synthesis_results, field):
+    terms = set()
+    for synthesis in synthesis_results.values():
+        values = synthesis.get(field, []) if isinstance(synthesis, dict) else []
+        for value in values if isinstance(values, list) else []:
+            term = normalize_term(value)
+            if term:
+                terms.add(term)
+    return terms
+
+
+class ConvergenceController:
+    # Tracks what each iteration added and decides whether another one is worth it
+
+    def __init__(self, min_gain=CONVERGENCE_MIN_GAIN, time_budget=RUN_TIME_BUDGET_SECONDS,
+                 token_budget=RUN_TOKEN_BUDGET, token_usage=None):
+        self.min_gain = min_gain
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+        self.token_usage = token_usage
+        self.started = time.monotonic()
+        self.urls = set()
+        self.concepts = set()
+        self.weak_areas = None
+        self.history = []
+
+    def observe(self, retrieval_results, synthesis_results):
+        urls = source_urls(retrieval_results)
+        concepts = synthesis_terms(synthesis_results, "core_concepts")
+        weak_areas = len(synthesis_terms(synthesis_results, "weak_or_missing_areas"))
+
+        new_urls = len(urls - self.urls)
+        new_concepts = len(concepts - self.concepts)
+        known = len(self.urls) + len(self.concepts)
+
+        gain = {
+            "new_urls": new_urls,
+            "new_concepts": new_concepts,
+            "weak_areas": weak_areas,
+            "weak_areas_closed": 0 if self.weak_areas is None else self.weak_areas - weak_areas,
+            # The first iteration has nothing to compare against
+            "gain": None if not known else (new_urls + new_concepts) / known,
+        }
+
+        self.urls |= urls
+        self.concepts |= concepts
+        self.weak_areas = weak_areas
+        self.history.append(gain)
+
+        return gain
+
+    def converged(self):
+        if not self.history or self.history[-1]["gain"] is None:
+            return False
+        last = self.history[-1]
+        return last["gain"] < self.min_gain and last["weak_areas_closed"] <= 0
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def tokens_used(self):
+        return self.token_usage() if self.token_usage else 0
+
+    def budget_exhausted(self):
+        # Returns the reason the run is out of budget, or None
+        if self.time_budget > 0 and self.elapsed() >= self.time_budget:
+            return f"time budget of {self.time_budget:g}s reached"
+        if self.token_budget > 0 and self.tokens_used() >= self.token_budget:
+            return f"token budget of {self.token_budget} reached"
+        return None
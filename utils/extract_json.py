@@ -1,20 +1,178 @@
-def extract_json(reply):
-    import re
-    import json
+import re
+import json
+
+ANSWER_OPEN = "<answer>"
+ANSWER_CLOSE = "</answer>"
+
+CODE_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+CLOSING = {"[": "]", "{": "}"}
+LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def answer_block(reply):
+    # Text between the answer tags. A reply cut off before </answer> keeps what it has,
+    # and a reply that forgot the tags falls back to its first JSON bracket.
+    start = reply.find(ANSWER_OPEN)
+    if start != -1:
+        start += len(ANSWER_OPEN)
+        end = reply.find(ANSWER_CLOSE, start)
+        text = reply[start:end if end != -1 else len(reply)]
+    else:
+        brackets = [i for i in (reply.find("["), reply.find("{")) if i != -1]
+        if not brackets:
+            raise ValueError("No <answer> block found")
+        text = reply[min(brackets):]
+        end = text.rfind(ANSWER_CLOSE)
+        if end != -1:
+            text = text[:end]
+
+    return CODE_FENCE.sub("", text.strip())
+
+
+def _closes_string(text, i):
+    # A quote ends the string only when what follows can continue the JSON;
+    # anything else is a quote the model forgot to escape
+    rest = text[i + 1:].lstrip(" \t\r\n")
+    return not rest or rest[0] in ",:}]"
+
+
+def repair_json(text):
+    # One pass that escapes stray quotes and raw newlines inside strings, drops
+    # trailing commas, maps Python literals and closes whatever a truncated reply
+    # left open. Returns the candidates to try, best first.
+    out = []
+    stack = []
+    in_string = False
+    escaped = False
+    # Output length and open brackets right before the last separator: everything
+    # up to there is complete, so a truncated tail can be cut back to it
+    last_safe = None
+
+    i = 0
+    while i < len(text):
+        char = text[i]
+
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                if _closes_string(text, i):
+                    in_string = False
+                else:
+                    char = '\\"'
+            elif char == "\n":
+                char = "\\n"
+            elif char in "\r\t" or ord(char) < 0x20:
+                char = " "
+            out.append(char)
+            i += 1
+            continue
 
-    match = re.search(r"<answer>(.*?)</answer>", reply, re.DOTALL)
+        if char == '"':
+            in_string = True
+        elif char in CLOSING:
+            stack.append(CLOSING[char])
+        elif char in "]}":
+            # Trailing comma before a closing bracket
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack and stack[-1] == char:
+                stack.pop()
+            elif stack:
+                # Mismatched bracket: close what the model opened instead
+                char = stack.pop()
+        elif char == ",":
+            last_safe = (len(out), list(stack))
+        elif char.isalpha():
+            word = re.match(r"[A-Za-z]+", text[i:]).group(0)
+            out.append(LITERALS.get(word, word))
+            i += len(word)
+            continue
 
-    if not match:
-        raise ValueError("No <answer> block found")
+        out.append(char)
+        i += 1
 
-    json_text = match.group(1).strip()
+    repaired = "".join(out)
+    if not stack:
+        return [repaired + '"' if in_string else repaired]
 
-    # Remove invalid control characters
-    json_text = re.sub(r"[\x00-\x1f\x7f]", "", json_text)
+    closed = (repaired + '"' if in_string else repaired).rstrip().rstrip(",:") + "".join(reversed(stack))
+    if last_safe is None:
+        return [closed]
 
+    length, open_brackets = last_safe
+    cut_back = "".join(out[:length]) + "".join(reversed(open_brackets))
+    # A string cut off mid-way (half a URL, say) is dropped rather than kept as if complete
+    return [cut_back, closed] if in_string else [closed, cut_back]
+
+
+def parse_json(text):
+    # Strict parse first; the repairs only run for replies that need them.
+    # Raises json.JSONDecodeError with the original text in .doc when nothing parses.
     try:
-        return json.loads(json_text)
+        return json.loads(text)
     except json.JSONDecodeError as e:
-        print("JSON parse failed. Cleaned output below:")
-        print(json_text)
-        raise e
\ No newline at end of file
+        error = e
+
+    for candidate in repair_json(text):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+
+    raise json.JSONDecodeError(error.msg, text, error.pos)
+
+
+def split_array(text):
+    # Top-level array elements as (raw text, parsed value or None), so only the
+    # elements that did not parse need a second look
+    if not text.lstrip().startswith("["):
+        return None
+
+    elements = []
+    depth = 0
+    in_string = False
+    escaped = False
+    start = text.index("[") + 1
+
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"' and _closes_string(text, i):
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif char in "]}" and depth:
+            depth -= 1
+        elif char in ",]" and depth == 0:
+            elements.append(text[start:i])
+            start = i + 1
+            if char == "]":
+                break
+    else:
+        elements.append(text[start:])
+
+    parsed = []
+    for raw in elements:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            parsed.append((raw, parse_json(raw)))
+        except json.JSONDecodeError:
+            parsed.append((raw, None))
+    return parsed
+
+
+def extract_json(reply):
+    return parse_json(answer_block(reply))
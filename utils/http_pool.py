@@ -0,0 +1,151 @@
+import threading
+from utils.config import env, env_flag
+from utils.metrics import HTTP_CONNECTIONS, HTTP_REQUESTS
+
+HTTP_MAX_CONNECTIONS = int(env("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(env("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(env("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(env("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_TIMEOUT = float(env("HTTP_TIMEOUT", "60"))
+HTTP2_DISABLED = env_flag("HTTP2_DISABLED")
+
+
+def http2_available():
+    # HTTP/2 needs the optional h2 package; without it the pool falls back to HTTP/1.1 keep-alive
+    if HTTP2_DISABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+_lock = threading.Lock()
+_clients = {}
+host_stats = {}
+
+
+def _host_entry(host):
+    return host_stats.setdefault(host, {"requests": 0, "connections": 0, "tls_handshakes": 0})
+
+
+def _count(host, field):
+    with _lock:
+        _host_entry(host)[field] += 1
+
+    if field == "requests":
+        HTTP_REQUESTS.inc(host=host)
+    elif field == "connections":
+        HTTP_CONNECTIONS.inc(host=host)
+
+
+def _trace_for(host):
+    # httpcore reports connection setup through the "trace" request extension
+    def trace(event_name, info):
+        if event_name == "connection.connect_tcp.started":
+            _count(host, "connections")
+        elif event_name == "connection.start_tls.complete":
+            _count(host, "tls_handshakes")
+
+    async def async_trace(event_name, info):
+        trace(event_name, info)
+
+    return trace, async_trace
+
+
+def _on_request(request):
+    host = request.url.host
+    _count(host, "requests")
+    request.extensions["trace"] = _trace_for(host)[0]
+
+
+async def _on_async_request(request):
+    host = request.url.host
+    _count(host, "requests")
+    request.extensions["trace"] = _trace_for(host)[1]
+
+
+# httpx is imported on first use so importing the pipeline stays cheap
+def pool_limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def pool_timeout():
+    import httpx
+    return httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def transport_errors():
+    import httpx
+    return (httpx.TransportError,)
+
+
+def _build(kind, **kwargs):
+    import httpx
+    options = {
+        "http2": http2_available(),
+        "limits": pool_limits(),
+        "timeout": pool_timeout(),
+        **kwargs
+    }
+    if kind == "async":
+        return httpx.AsyncClient(event_hooks={"request": [_on_async_request]}, **options)
+    return httpx.Client(event_hooks={"request": [_on_request]}, **options)
+
+
+def _shared(kind):
+    with _lock:
+        client = _clients.get(kind)
+        if client is None or client.is_closed:
+            client = _clients[kind] = _build(kind)
+        return client
+
+
+def sync_client():
+    # One pooled client shared by every agent so connections to Groq and Tavily are reused
+    return _shared("sync")
+
+
+def async_client():
+    # Async counterpart for code running on an event loop; pools separately from sync_client
+    return _shared("async")
+
+
+def new_client(**kwargs):
+    # Unshared, instrumented client (used by benchmarks to compare against the shared pool)
+    return _build("sync", **kwargs)
+
+
+def connection_stats():
+    with _lock:
+        return {
+            host: {
+                **stats,
+                "reused": max(0, stats["requests"] - stats["connections"]),
+            }
+            for host, stats in host_stats.items()
+        }
+
+
+def reset_stats():
+    with _lock:
+        host_stats.clear()
+
+
+def close():
+    with _lock:
+        client = _clients.pop("sync", None)
+    if client is not None:
+        client.close()
+
+
+async def aclose():
+    with _lock:
+        client = _clients.pop("async", None)
+    if client is not None:
+        await client.aclose()
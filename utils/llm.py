@@ -0,0 +1,313 @@
+import os
+import json
+import threading
+from utils.config import env, env_flag
+from utils import http_pool
+from utils.disk_cache import CACHE_DIR, DiskCache, make_cache_key
+from utils.extract_json import ANSWER_CLOSE, ANSWER_OPEN, answer_block, parse_json, split_array
+from utils.metrics import ANSWER_PARSES, CACHE_REQUESTS, LLM_TOKENS
+from utils.prompt_packing import estimate_tokens
+from utils.scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, scheduler
+from utils.tracing import annotate, span
+
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+LLM_CACHE_ENABLED = not env_flag("LLM_CACHE_DISABLED")
+LLM_CACHE_TTL = float(env("LLM_CACHE_TTL", str(7 * 24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(env("LLM_CACHE_MAX_ENTRIES", "10000"))
+# Completion tokens count against the tokens/min quota too; used when max_tokens is not set
+COMPLETION_TOKEN_ESTIMATE = int(env("COMPLETION_TOKEN_ESTIMATE", "512"))
+# Answers that still do not parse after local repair are sent back on their own to be fixed
+ANSWER_REPAIR_REASK = env_flag("ANSWER_REPAIR_REASK", True)
+
+# Calls a user is waiting on go ahead of bulk per-task work when the quota is tight
+AGENT_PRIORITY = {
+    "task_agent": PRIORITY_INTERACTIVE,
+    "gap_agent": PRIORITY_INTERACTIVE,
+    "report_agent": PRIORITY_INTERACTIVE,
+    "synthesis_agent": PRIORITY_NORMAL,
+    "retrieval_agent": PRIORITY_BACKGROUND,
+}
+
+repair_system_prompt = """You repair malformed JSON.
+Fix only the syntax: quotes, escapes, commas and brackets. Keep every key and value; do not add, drop or reword content.
+If you are given several array elements, return a JSON array with one repaired element for each.
+Return ONLY the corrected JSON inside <answer> tags."""
+
+# Built on first use so importing the pipeline needs neither the groq SDK nor a key.
+# Tests and benchmarks may assign a stand-in to either name.
+client = None
+async_client = None
+_client_lock = threading.Lock()
+
+completion_cache = DiskCache(
+    env("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite")),
+    ttl=LLM_CACHE_TTL,
+    max_entries=LLM_CACHE_MAX_ENTRIES
+)
+
+_stats_lock = threading.Lock()
+agent_stats = {}
+
+
+def get_client():
+    # Both clients share the process-wide connection pool limits instead of opening their own.
+    # Retries are left to utils.scheduler so backoff is coordinated across threads.
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from groq import Groq
+                client = Groq(api_key=env("GROQ_API_KEY"), http_client=http_pool.sync_client(), max_retries=0)
+    return client
+
+
+def get_async_client():
+    # For callers on an event loop; nothing in the pipeline needs it yet
+    global async_client
+    if async_client is None:
+        with _client_lock:
+            if async_client is None:
+                from groq import AsyncGroq
+                async_client = AsyncGroq(api_key=env("GROQ_API_KEY"), http_client=http_pool.async_client(), max_retries=0)
+    return async_client
+
+
+def _connection_errors():
+    try:
+        from groq import APIConnectionError
+    except ImportError:
+        return ()
+    return (APIConnectionError,)
+
+
+def _record(agent, hit):
+    with _stats_lock:
+        stats = agent_stats.setdefault(agent, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+    CACHE_REQUESTS.inc(cache=agent, result="hit" if hit else "miss")
+    annotate(cached=hit)
+
+
+def _usage_of(response):
+    # Groq reports streamed usage under x_groq on the final chunk
+    usage = getattr(response, "usage", None) or getattr(getattr(response, "x_groq", None), "usage", None)
+    if usage is None:
+        return None
+    return usage.prompt_tokens, usage.completion_tokens
+
+
+def _record_usage(agent, prompt_tokens, completion_tokens, estimated=False):
+    LLM_TOKENS.inc(prompt_tokens, agent=agent, type="prompt")
+    LLM_TOKENS.inc(completion_tokens, agent=agent, type="completion")
+    annotate(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, tokens_estimated=estimated)
+
+
+def cache_stats():
+    with _stats_lock:
+        return {
+            agent: {
+                **stats,
+                "hit_rate": stats["hits"] / (stats["hits"] + stats["misses"]),
+            }
+            for agent, stats in agent_stats.items()
+        }
+
+
+def _cached_reply(agent, cache_key, use_cache):
+    if not use_cache:
+        return None
+
+    reply = completion_cache.get(cache_key)
+    _record(agent, hit=reply is not None)
+
+    return reply
+
+
+def _store_reply(cache_key, use_cache, reply):
+    if use_cache:
+        completion_cache.set(cache_key, reply)
+
+
+def _build_request(model, messages, timeout, params, stream):
+    request = {"model": model, "messages": messages, "stream": stream, **params}
+    if timeout is not None:
+        request["timeout"] = timeout
+    return request
+
+
+def prompt_tokens(messages):
+    return sum(estimate_tokens(message.get("content") or "") for message in messages)
+
+
+def request_tokens(messages, params):
+    return prompt_tokens(messages) + params.get("max_tokens", COMPLETION_TOKEN_ESTIMATE)
+
+
+def _create(request, agent):
+    return scheduler.call(
+        "groq",
+        lambda: get_client().chat.completions.create(**request),
+        tokens=request_tokens(request["messages"], request),
+        priority=AGENT_PRIORITY.get(agent, PRIORITY_NORMAL),
+        retry_on=_connection_errors()
+    )
+
+
+def complete(messages, agent="default", model=DEFAULT_MODEL, use_cache=True, timeout=None, **params):
+    with span("groq.chat", agent=agent, model=model):
+        use_cache = use_cache and LLM_CACHE_ENABLED
+        cache_key = make_cache_key(model, messages, params)
+
+        reply = _cached_reply(agent, cache_key, use_cache)
+        if reply is not None:
+            return reply
+
+        completion = _create(_build_request(model, messages, timeout, params, stream=False), agent)
+        reply = completion.choices[0].message.content
+        usage = _usage_of(completion)
+        if usage:
+            _record_usage(agent, *usage)
+
+        _store_reply(cache_key, use_cache, reply)
+
+        return reply
+
+
+def stream_reply(messages, model=DEFAULT_MODEL, timeout=None, agent="default", **params):
+    stream = _create(_build_request(model, messages, timeout, params, stream=True), agent)
+
+    reply = ""
+    answer_from = None
+    usage = None
+
+    try:
+        for chunk in stream:
+            usage = _usage_of(chunk) or usage
+            if not chunk.choices:
+                continue
+
+            delta = chunk.choices[0].delta.content or ""
+            if not delta:
+                continue
+
+            # Only rescan the tail that could contain a tag split across chunks
+            scan_from = max(0, len(reply) - len(ANSWER_CLOSE))
+            reply += delta
+
+            if answer_from is None:
+                open_at = reply.find(ANSWER_OPEN, scan_from)
+                if open_at == -1:
+                    continue
+                answer_from = open_at + len(ANSWER_OPEN)
+                scan_from = answer_from
+
+            close_at = reply.find(ANSWER_CLOSE, max(scan_from, answer_from))
+            if close_at != -1:
+                # Anything the model writes after </answer> is discarded anyway
+                return reply[:close_at + len(ANSWER_CLOSE)]
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+        # Stopping at </answer> usually skips the final usage chunk, so fall back to an estimate
+        if usage:
+            _record_usage(agent, *usage)
+        else:
+            _record_usage(agent, prompt_tokens(messages), estimate_tokens(reply), estimated=True)
+
+    return reply
+
+
+def _reask(broken_text, agent, model, timeout):
+    # A small follow-up with just the broken JSON instead of re-running the whole prompt
+    messages = [
+        {"role": "system", "content": repair_system_prompt},
+        {"role": "user", "content": broken_text}
+    ]
+    reply = complete(
+        messages, agent=agent, model=model, timeout=timeout,
+        max_tokens=estimate_tokens(broken_text) * 2 + 64, temperature=0
+    )
+    return parse_json(answer_block(reply))
+
+
+def parse_answer(reply, agent="default", model=DEFAULT_MODEL, timeout=None):
+    # Strict parse, then local repair, then a re-ask for only the part that is still broken.
+    # Raises json.JSONDecodeError (answer text in .doc) when that fails too and
+    # ValueError when the reply holds no JSON at all.
+    answer_text = answer_block(reply)
+
+    try:
+        answer = json.loads(answer_text)
+        ANSWER_PARSES.inc(agent=agent, result="clean")
+        return answer
+    except json.JSONDecodeError:
+        pass
+
+    try:
+        answer = parse_json(answer_text)
+        ANSWER_PARSES.inc(agent=agent, result="repaired")
+        annotate(answer="repaired")
+        return answer
+    except json.JSONDecodeError as e:
+        error = e
+
+    # In an array only the elements that did not parse go back to the model
+    elements = split_array(answer_text)
+    broken = [raw for raw, value in elements or [] if value is None]
+    partial = bool(elements) and len(broken) < len(elements)
+
+    if partial and not broken:
+        # Every element parses on its own; only the separators between them were broken
+        ANSWER_PARSES.inc(agent=agent, result="repaired")
+        annotate(answer="repaired")
+        return [value for _, value in elements]
+
+    if not ANSWER_REPAIR_REASK:
+        ANSWER_PARSES.inc(agent=agent, result="failed")
+        raise error
+
+    try:
+        if partial:
+            fixed = _reask("[\n" + ",\n".join(broken) + "\n]", agent, model, timeout)
+            if not isinstance(fixed, list):
+                fixed = [fixed]
+            fixed = iter(fixed if len(fixed) == len(broken) else [])
+            answer = [value if value is not None else next(fixed, None) for _, value in elements]
+            answer = [value for value in answer if value is not None]
+        else:
+            answer = _reask(answer_text, agent, model, timeout)
+    except Exception:
+        if not partial:
+            ANSWER_PARSES.inc(agent=agent, result="failed")
+            raise error
+        # Keep the elements that did parse rather than losing the whole answer
+        answer = [value for _, value in elements if value is not None]
+
+    ANSWER_PARSES.inc(agent=agent, result="reasked")
+    annotate(answer="reasked")
+    return answer
+
+
+def complete_answer(messages, agent="default", model=DEFAULT_MODEL, use_cache=True, timeout=None, **params):
+    # Streams the completion, stops reading at </answer> and returns the parsed
+    # JSON answer, repaired where needed. Raises json.JSONDecodeError (raw text in
+    # .doc) when it cannot be repaired and ValueError when the reply holds no JSON.
+    with span("groq.chat", agent=agent, model=model):
+        use_cache = use_cache and LLM_CACHE_ENABLED
+        cache_key = make_cache_key(model, messages, params)
+
+        reply = _cached_reply(agent, cache_key, use_cache)
+        if reply is not None:
+            return parse_answer(reply, agent, model, timeout)
+
+        reply = stream_reply(messages, model=model, timeout=timeout, agent=agent, **params)
+        answer = parse_answer(reply, agent, model, timeout)
+
+        # The parsed answer is cached rather than the raw reply, so a hit never repeats
+        # the repair or re-ask, and a generation that could not be parsed is never stored
+        _store_reply(cache_key, use_cache, f"{ANSWER_OPEN}{json.dumps(answer)}{ANSWER_CLOSE}")
+
+        return answer
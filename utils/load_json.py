@@ -0,0 +1,13 @@
+import json
+import os
+
+
+def load_json(path, default=None):
+    if not path or not os.path.exists(path):
+        return default
+
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return default
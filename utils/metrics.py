@@ -0,0 +1,91 @@
+import threading
+
+# Latency buckets in seconds, from cache hits up to slow multi-minute stages
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_metrics = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Counter:
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self.values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            entry = self.values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, entry in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                lines.append(f"{self.name}_bucket{_labels(key, ('le', bound))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(key, ('le', '+Inf'))} {entry['count']}")
+            lines.append(f"{self.name}_sum{_labels(key)} {entry['sum']}")
+            lines.append(f"{self.name}_count{_labels(key)} {entry['count']}")
+        return lines
+
+
+def render():
+    # Prometheus text exposition format
+    with _lock:
+        metrics = list(_metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+SPAN_DURATION = Histogram("research_span_duration_seconds", "Duration of pipeline stages, tasks and external calls.")
+LLM_TOKENS = Counter("research_llm_tokens_total", "Tokens used by Groq completions.")
+CACHE_REQUESTS = Counter("research_cache_requests_total", "LLM and search cache lookups.")
+PROVIDER_RETRIES = Counter("research_provider_retries_total", "Provider calls retried after a transient failure.")
+PROVIDER_FAILURES = Counter("research_provider_failures_total", "Provider calls that failed after retries.")
+HTTP_REQUESTS = Counter("research_http_requests_total", "HTTP requests sent through the shared pool.")
+HTTP_CONNECTIONS = Counter("research_http_connections_total", "New HTTP connections opened by the shared pool.")
+RUNS = Counter("research_runs_total", "Research runs by final status.")
+ANSWER_PARSES = Counter("research_answer_parses_total", "Model answers by how they were parsed: clean, repaired, reasked or failed.")
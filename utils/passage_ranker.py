@@ -0,0 +1,136 @@
+import re
+import math
+from collections import Counter
+from utils.config import env
+from utils.prompt_packing import CHARS_PER_TOKEN
+from utils.similarity import words
+
+# Token budget for the search snippets of one task; 0 falls back to a plain prefix cut
+RETRIEVAL_TASK_TOKEN_BUDGET = int(env("RETRIEVAL_TASK_TOKEN_BUDGET", "1000"))
+PASSAGE_MAX_CHARS = int(env("RETRIEVAL_PASSAGE_CHARS", "320"))
+SNIPPET_CHARS = 1200
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\n+")
+# Navigation, cookie banners and share bars that survive Tavily's content extraction
+BOILERPLATE = re.compile(
+    r"^(skip to|cookie|accept all|subscribe|sign (in|up)|log ?in|share (this|on)|"
+    r"all rights reserved|copyright|privacy policy|terms of (use|service)|advertisement)",
+    re.IGNORECASE
+)
+
+
+def split_passages(text, max_chars=PASSAGE_MAX_CHARS):
+    # Sentences merged in reading order into passages of at most max_chars;
+    # a single longer sentence becomes its own passage
+    passages = []
+    current = ""
+
+    for sentence in SENTENCE_END.split(text or ""):
+        sentence = re.sub(r"\s+", " ", sentence).strip()
+        if len(sentence) < 3 or BOILERPLATE.match(sentence):
+            continue
+
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            passages.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+
+    if current:
+        passages.append(current)
+
+    return passages
+
+
+class BM25:
+    # Okapi BM25 over a small in-memory collection of passages
+
+    def __init__(self, passages, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(words(passage)) for passage in passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+
+        total = len(passages)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query):
+        query_terms = [term for term in set(words(query)) if term in self.idf]
+        scores = []
+
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            score = 0.0
+            for term in query_terms:
+                frequency = counts.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append(score)
+
+        return scores
+
+
+def choose_passages(query, documents, token_budget=RETRIEVAL_TASK_TOKEN_BUDGET):
+    # documents are lists of passages; returns, per document, the positions of the
+    # passages that best match the query. Every document keeps its best passage so no
+    # source drops out of the prompt; the rest of the budget goes to the highest
+    # scoring passages across all documents.
+    passages = []
+    for doc_index, document in enumerate(documents):
+        for position, passage in enumerate(document):
+            passages.append((doc_index, position, passage))
+
+    chosen = [set() for _ in documents]
+    if not passages:
+        return chosen
+
+    scores = BM25([passage for _, _, passage in passages]).scores(query)
+    # Highest score first; ties keep reading order so earlier passages win
+    ranked = sorted(range(len(passages)), key=lambda i: (-scores[i], passages[i][0], passages[i][1]))
+
+    budget = token_budget * CHARS_PER_TOKEN
+    picked = set()
+
+    for i in ranked:
+        doc_index, position, passage = passages[i]
+        if not chosen[doc_index]:
+            chosen[doc_index].add(position)
+            picked.add(i)
+            budget -= len(passage)
+
+    for i in ranked:
+        if budget <= 0 or scores[i] <= 0:
+            break
+        doc_index, position, passage = passages[i]
+        if i not in picked and len(passage) <= budget:
+            chosen[doc_index].add(position)
+            picked.add(i)
+            budget -= len(passage)
+
+    return chosen
+
+
+def join_passages(passages, positions):
+    return " … ".join(passages[position] for position in sorted(positions))
+
+
+def select_passages(query, documents, token_budget=RETRIEVAL_TASK_TOKEN_BUDGET, max_chars=PASSAGE_MAX_CHARS):
+    # Returns one snippet per document built from its passages that best match the query
+    if token_budget <= 0:
+        return [(document or "")[:SNIPPET_CHARS] for document in documents]
+
+    split = [split_passages(document, max_chars) for document in documents]
+    chosen = choose_passages(query, split, token_budget)
+
+    return [join_passages(passages, positions) for passages, positions in zip(split, chosen)]
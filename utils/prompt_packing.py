@@ -0,0 +1,118 @@
+import copy
+import json
+from utils.config import env
+
+# Rough llama tokenizer ratio for English prose and compact JSON
+CHARS_PER_TOKEN = 4
+
+GAP_PROMPT_TOKEN_BUDGET = int(env("GAP_PROMPT_TOKEN_BUDGET", "3000"))
+REPORT_PROMPT_TOKEN_BUDGET = int(env("REPORT_PROMPT_TOKEN_BUDGET", "3500"))
+
+# Strings shorter than twice this are never truncated
+MIN_STRING_CHARS = 120
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def pack_syntheses(synthesized_data):
+    packed = {}
+
+    for task_description, synthesis in synthesized_data.items():
+        if not isinstance(synthesis, dict):
+            continue
+        if "error" in synthesis:
+            # A failed synthesis carries no usable evidence, only its raw output
+            packed[task_description] = {"error": synthesis["error"]}
+            continue
+
+        # The task text is already the key, so the repeated "task" field is dropped
+        packed[task_description] = {
+            key: value for key, value in synthesis.items()
+            if key != "task" and value not in ("", [], {}, None)
+        }
+
+    return packed
+
+
+def pack_gaps(gap_data):
+    if not isinstance(gap_data, dict):
+        return {}
+    if "error" in gap_data:
+        return {"error": gap_data["error"]}
+
+    return {key: value for key, value in gap_data.items() if value not in ("", [], {}, None)}
+
+
+def _largest_list(node):
+    largest = None
+
+    if isinstance(node, list):
+        if len(node) > 1:
+            largest = (len(compact_json(node)), node)
+        children = node
+    elif isinstance(node, dict):
+        children = node.values()
+    else:
+        return None
+
+    for child in children:
+        candidate = _largest_list(child)
+        if candidate and (largest is None or candidate[0] > largest[0]):
+            largest = candidate
+
+    return largest
+
+
+def _longest_string(node):
+    longest = None
+
+    if isinstance(node, dict):
+        items = list(node.items())
+    elif isinstance(node, list):
+        items = list(enumerate(node))
+    else:
+        return None
+
+    for key, value in items:
+        if isinstance(value, str):
+            if len(value) > MIN_STRING_CHARS * 2 and (longest is None or len(value) > longest[0]):
+                longest = (len(value), node, key)
+        else:
+            candidate = _longest_string(value)
+            if candidate and (longest is None or candidate[0] > longest[0]):
+                longest = candidate
+
+    return longest
+
+
+def fit_to_budget(data, token_budget):
+    # Shrinks a copy of data until its compact JSON fits the budget: the longest
+    # list loses its tail first, then the longest strings are cut short. The
+    # caller's data is left intact since it often still feeds the saved outputs.
+    text = compact_json(data)
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    data = copy.deepcopy(data)
+
+    while estimate_tokens(text) > token_budget:
+        largest = _largest_list(data)
+        if largest:
+            items = largest[1]
+            del items[max(1, len(items) * 3 // 4):]
+        else:
+            longest = _longest_string(data)
+            if not longest:
+                break
+            length, node, key = longest
+            node[key] = node[key][:length * 3 // 4].rstrip() + "…"
+
+        text = compact_json(data)
+
+    return text
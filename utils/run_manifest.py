@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from utils.load_json import load_json
+
+MANIFEST_FILE = "manifest.json"
+
+
+def input_hash(*inputs):
+    data = json.dumps(inputs, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+# Checkpoints of the run writing into one output folder: every finished stage and
+# per-task unit with a hash of the inputs it was produced from. A run that dies
+# leaves the manifest behind so the next run of the same query can pick up from
+# the first unit that did not finish.
+class RunManifest:
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.path = os.path.join(folder_path, MANIFEST_FILE)
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def resume(self, query, run_id=None):
+        # Returns the previous manifest when it belongs to an unfinished run of
+        # the same query, otherwise starts a fresh one
+        previous = load_json(self.path, {})
+        resumable = (
+            previous.get("query") == query
+            and previous.get("status") != "completed"
+            and previous.get("units")
+        )
+
+        with self._lock:
+            if resumable:
+                self.data = {**previous, "status": "running", "run_id": run_id, "resumed_at": time.time()}
+            else:
+                self.data = {
+                    "query": query,
+                    "status": "running",
+                    "run_id": run_id,
+                    "started_at": time.time(),
+                    "iteration": 0,
+                    "units": {},
+                }
+            self._save()
+
+        return previous if resumable else None
+
+    def lookup(self, stage, inputs, key=""):
+        # The unit's checkpoint if it finished with these exact inputs
+        with self._lock:
+            unit = self.data.get("units", {}).get(stage, {}).get(key)
+        if unit is None or unit["inputs"] != inputs:
+            return None
+        if "file" in unit and not os.path.exists(os.path.join(self.folder_path, unit["file"])):
+            return None
+        return unit
+
+    def complete(self, stage, inputs, key="", result=None, file=None):
+        unit = {"inputs": inputs, "finished_at": time.time()}
+        if file is not None:
+            unit["file"] = os.path.basename(file)
+        else:
+            unit["result"] = result
+
+        with self._lock:
+            self.data["units"].setdefault(stage, {})[key] = unit
+            self._save()
+
+    def set_iteration(self, iteration, task_descriptions):
+        # The task list an iteration started with; a resumed run restarts that iteration from it
+        with self._lock:
+            self.data["iteration"] = iteration
+            self.data["iteration_tasks"] = list(task_descriptions)
+            self._save()
+
+    def finish(self, status):
+        with self._lock:
+            self.data["status"] = status
+            self.data["finished_at"] = time.time()
+            self._save()
+
+    def unit_count(self):
+        with self._lock:
+            return sum(len(units) for units in self.data.get("units", {}).values())
+
+    def _save(self):
+        # Written to a temporary file first so a killed process never leaves half a manifest
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(self.data, f)
+        os.replace(temporary_path, self.path)
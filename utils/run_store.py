@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+OUTPUT_FILES = {
+    "tasks": "tasks.json",
+    "retrieval": "retrieval_results.json",
+    "synthesis": "synthesis_results.json",
+    "gap": "gap_results.json",
+    "report": "final_report.json",
+    "trace": "trace.json",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    query TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_folder ON runs (folder, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_query ON runs (query);
+
+CREATE TABLE IF NOT EXISTS iterations (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    PRIMARY KEY (run_id, number)
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    priority INTEGER,
+    type TEXT,
+    PRIMARY KEY (run_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_description ON tasks (description);
+
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    task TEXT NOT NULL,
+    url TEXT,
+    title TEXT,
+    summary TEXT,
+    key_points TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sources_url ON sources (url);
+CREATE INDEX IF NOT EXISTS idx_sources_run ON sources (run_id, task);
+
+CREATE TABLE IF NOT EXISTS outputs (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    iteration INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, kind, iteration)
+);
+"""
+
+
+# SQLite (WAL) repository for research runs: every stage output is written in
+# its own transaction next to the JSON files, and results are read back from
+# here instead of re-parsing model_output_data/
+class RunStore:
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        # Opened on first use so importing the pipeline creates no database files
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        return conn
+
+    def start_run(self, query, folder, created_at=None):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (query, folder, status, created_at) VALUES (?, ?, 'running', ?)",
+                (query, folder, created_at or time.time())
+            )
+            return cursor.lastrowid
+
+    def start_iteration(self, run_id, number):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO iterations (run_id, number, started_at) VALUES (?, ?, ?)",
+                (run_id, number, time.time())
+            )
+
+    def finish_run(self, run_id, status="completed", finished_at=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE id = ?",
+                (status, finished_at or time.time(), run_id)
+            )
+
+    def save_output(self, run_id, kind, data, iteration=0):
+        if kind not in OUTPUT_FILES:
+            raise ValueError(f"Unknown output kind: {kind}")
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outputs (run_id, kind, iteration, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, kind, iteration, json.dumps(data), time.time())
+            )
+
+            if kind == "tasks":
+                self._conn.execute("DELETE FROM tasks WHERE run_id = ?", (run_id,))
+                self._conn.executemany(
+                    "INSERT INTO tasks (run_id, position, description, priority, type) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (run_id, position, task.get("description", ""), task.get("priority"), task.get("type"))
+                        for position, task in enumerate(data)
+                        if isinstance(task, dict)
+                    ]
+                )
+            elif kind == "retrieval":
+                self._conn.execute("DELETE FROM sources WHERE run_id = ?", (run_id,))
+                self._conn.executemany(
+                    "INSERT INTO sources (run_id, task, url, title, summary, key_points) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            run_id, task, item.get("source"), item.get("title"), item.get("summary"),
+                            json.dumps(item.get("key_points", []))
+                        )
+                        for task, items in data.items()
+                        for item in (items if isinstance(items, list) else [])
+                        if isinstance(item, dict)
+                    ]
+                )
+
+    def load_output(self, run_id, kind):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM outputs WHERE run_id = ? AND kind = ? ORDER BY iteration DESC LIMIT 1",
+                (run_id, kind)
+            ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def load_results(self, run_id):
+        report = self.load_output(run_id, "report")
+        if report is None:
+            return None
+
+        return {
+            "tasks": self.load_output(run_id, "tasks") or [],
+            "synthesis": self.load_output(run_id, "synthesis") or {},
+            "report": report
+        }
+
+    def get_run(self, run_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_run(self, folder, status="completed"):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM runs WHERE folder = ? AND status = ? ORDER BY created_at DESC LIMIT 1",
+                (folder, status)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_runs(self, query=None, limit=50):
+        sql = "SELECT * FROM runs"
+        params = []
+        if query:
+            sql += " WHERE query LIKE ? OR folder LIKE ?"
+            params += [f"%{query}%", f"%{query}%"]
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def runs_citing(self, url, limit=50):
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT DISTINCT runs.* FROM sources JOIN runs ON runs.id = sources.run_id
+                WHERE sources.url = ? ORDER BY runs.created_at DESC LIMIT ?
+                """,
+                (url, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_folder(self, folder_path):
+        # Imports one legacy model_output_data/<folder> as a finished run
+        folder = os.path.basename(os.path.normpath(folder_path))
+
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM runs WHERE folder = ? LIMIT 1", (folder,)).fetchone()
+        if exists:
+            return None
+
+        outputs = {}
+
+        for kind, file_name in OUTPUT_FILES.items():
+            path = os.path.join(folder_path, file_name)
+            if os.path.exists(path):
+                try:
+                    with open(path, "r") as f:
+                        outputs[kind] = (json.load(f), os.path.getmtime(path))
+                except json.JSONDecodeError:
+                    print(f"Skipping unreadable {path}")
+
+        if "tasks" not in outputs:
+            return None
+
+        created_at = min(mtime for _, mtime in outputs.values())
+        finished_at = max(mtime for _, mtime in outputs.values())
+        run_id = self.start_run(folder.replace("_", " "), folder, created_at=created_at)
+
+        for kind, (data, _) in outputs.items():
+            self.save_output(run_id, kind, data)
+
+        self.finish_run(run_id, "completed" if "report" in outputs else "incomplete", finished_at=finished_at)
+        return run_id
+
+    def import_folders(self, base_path):
+        imported = []
+        for folder in sorted(os.listdir(base_path)):
+            folder_path = os.path.join(base_path, folder)
+            if os.path.isdir(folder_path):
+                run_id = self.import_folder(folder_path)
+                if run_id is not None:
+                    imported.append(run_id)
+        return imported
+
+
+if __name__ == "__main__":
+    # python -m utils.run_store [model_output_data] [store path]
+    base_path = sys.argv[1] if len(sys.argv) > 1 else "model_output_data"
+    store_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base_path, "research_runs.sqlite")
+
+    imported = RunStore(store_path).import_folders(base_path)
+    print(f"Imported {len(imported)} run(s) into {store_path}")
@@ -0,0 +1,206 @@
+import time
+import heapq
+import random
+import itertools
+import threading
+from email.utils import parsedate_to_datetime
+from utils.config import env
+from utils.metrics import PROVIDER_FAILURES, PROVIDER_RETRIES
+from utils.tracing import increment
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+SCHEDULER_MAX_RETRIES = int(env("SCHEDULER_MAX_RETRIES", "4"))
+SCHEDULER_BACKOFF_BASE = float(env("SCHEDULER_BACKOFF_BASE", "1"))
+SCHEDULER_BACKOFF_CAP = float(env("SCHEDULER_BACKOFF_CAP", "30"))
+
+# Per-minute quotas; 0 disables that limit. Defaults follow the Groq free tier for
+# llama-3.1-8b-instant and Tavily's development plan.
+PROVIDER_LIMITS = {
+    "groq": {
+        "requests_per_minute": float(env("GROQ_REQUESTS_PER_MINUTE", "30")),
+        "tokens_per_minute": float(env("GROQ_TOKENS_PER_MINUTE", "6000")),
+    },
+    "tavily": {
+        "requests_per_minute": float(env("TAVILY_REQUESTS_PER_MINUTE", "100")),
+        "tokens_per_minute": 0,
+    },
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        if self.rate <= 0:
+            return 0
+        self._refill(now)
+        # A single request larger than the bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        return 0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        if self.rate > 0:
+            self.level -= min(amount, self.capacity)
+
+
+class ProviderLimiter:
+
+    def __init__(self, name, requests_per_minute=0, tokens_per_minute=0):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "failed": 0, "wait_seconds": 0.0}
+        self._waiting = []
+        self._order = itertools.count()
+        self._changed = threading.Condition()
+
+    def acquire(self, tokens=0, priority=PRIORITY_NORMAL):
+        # Callers queue by (priority, arrival); only the head of the queue may spend budget
+        entry = (priority, next(self._order))
+        started = time.monotonic()
+
+        with self._changed:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    delay = None
+                    if self._waiting[0] == entry:
+                        now = time.monotonic()
+                        delay = max(
+                            self.paused_until - now,
+                            self.requests.wait_time(1, now),
+                            self.tokens.wait_time(tokens, now)
+                        )
+                        if delay <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self.stats["requests"] += 1
+                            self.stats["wait_seconds"] += now - started
+                            return now - started
+                    self._changed.wait(delay)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._changed.notify_all()
+
+    def pause(self, seconds):
+        # A 429 means the shared quota is spent, so every caller holds off, not just this one
+        with self._changed:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.stats["rate_limited"] += 1
+            self._changed.notify_all()
+
+    def record(self, field):
+        with self._changed:
+            self.stats[field] += 1
+
+
+def status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(error, retry_on=()):
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError) + tuple(retry_on))
+
+
+def backoff_delay(attempt):
+    # Full jitter keeps retrying callers from hitting the provider in lockstep
+    return random.uniform(0, min(SCHEDULER_BACKOFF_CAP, SCHEDULER_BACKOFF_BASE * 2 ** attempt))
+
+
+class RequestScheduler:
+
+    def __init__(self, limits=PROVIDER_LIMITS, max_retries=SCHEDULER_MAX_RETRIES):
+        self.max_retries = max_retries
+        self.limiters = {name: ProviderLimiter(name, **limit) for name, limit in limits.items()}
+        self._lock = threading.Lock()
+
+    def limiter(self, provider):
+        with self._lock:
+            if provider not in self.limiters:
+                self.limiters[provider] = ProviderLimiter(provider)
+            return self.limiters[provider]
+
+    def _retry_delay(self, provider, limiter, error, attempt, retry_on):
+        # Returns how long to wait before retrying, or None when the error should propagate
+        if attempt == self.max_retries or not is_transient(error, retry_on):
+            limiter.record("failed")
+            PROVIDER_FAILURES.inc(provider=provider)
+            return None
+
+        delay = retry_after(error)
+        if delay is None:
+            delay = backoff_delay(attempt)
+
+        limiter.record("retries")
+        PROVIDER_RETRIES.inc(provider=provider)
+        increment("retries")
+        print(f"{provider} request failed ({status_code(error) or type(error).__name__}); retrying in {delay:.1f}s")
+
+        if status_code(error) == 429:
+            limiter.pause(delay)
+            return 0
+        return delay
+
+    def call(self, provider, fn, tokens=0, priority=PRIORITY_NORMAL, retry_on=()):
+        limiter = self.limiter(provider)
+
+        for attempt in range(self.max_retries + 1):
+            increment("queued_seconds", limiter.acquire(tokens, priority))
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(provider, limiter, e, attempt, retry_on)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    def stats(self):
+        return {name: dict(limiter.stats) for name, limiter in self.limiters.items()}
+
+
+scheduler = RequestScheduler()
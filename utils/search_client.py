@@ -0,0 +1,28 @@
+from utils.config import env
+from utils import http_pool
+
+TAVILY_API_URL = env("TAVILY_API_URL", "https://api.tavily.com")
+
+
+class TavilySearch:
+    # Drop-in for TavilyClient.search that sends requests through the shared connection pool
+    # (the SDK opens a fresh connection, and TLS session, for every call)
+
+    def __init__(self, api_key, base_url=TAVILY_API_URL, http_client=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.http_client = http_client
+
+    def _request(self, query, timeout, params):
+        return {
+            "url": f"{self.base_url}/search",
+            "json": {"query": query, "api_key": self.api_key, **params},
+            "headers": {"Authorization": f"Bearer {self.api_key}"},
+            "timeout": timeout,
+        }
+
+    def search(self, query, timeout=60, **params):
+        client = self.http_client or http_pool.sync_client()
+        response = client.post(**self._request(query, timeout, params))
+        response.raise_for_status()
+        return response.json()
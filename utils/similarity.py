@@ -0,0 +1,112 @@
+import re
+import random
+import zlib
+import threading
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "into",
+    "is", "it", "its", "of", "on", "or", "that", "the", "their", "this", "to", "with",
+    "what", "which", "e", "g", "eg", "etc", "various", "different",
+}
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def words(text):
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Cheap plural folding so "models" and "model" collide
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        yield word
+
+
+def tokenize(text):
+    return frozenset(words(text))
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+# MinHash signatures bucketed by LSH bands: a lookup only scores the entries
+# that share at least one band with the query instead of every stored entry
+class MinHashLSH:
+
+    def __init__(self, num_perm=32, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        rng = random.Random(seed)
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.perms = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self.buckets = {}
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def signature(self, tokens):
+        hashes = [zlib.crc32(token.encode("utf-8")) for token in tokens] or [0]
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self.perms
+        )
+
+    def _band_keys(self, signature):
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def add(self, key, tokens):
+        signature = self.signature(tokens)
+
+        with self._lock:
+            self._remove(key)
+            self.entries[key] = (tokens, signature)
+            for band_key in self._band_keys(signature):
+                self.buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+
+        for band_key in self._band_keys(entry[1]):
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def query(self, tokens, threshold, key_filter=None):
+        signature = self.signature(tokens)
+
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates |= self.buckets.get(band_key, set())
+
+            matches = []
+            for key in candidates:
+                if key_filter and not key_filter(key):
+                    continue
+                score = jaccard(tokens, self.entries[key][0])
+                if score >= threshold:
+                    matches.append((score, key))
+
+        return sorted(matches, key=lambda match: match[0], reverse=True)
+
+    def __len__(self):
+        return len(self.entries)
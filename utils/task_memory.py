@@ -0,0 +1,88 @@
+import os
+import time
+import threading
+from utils.load_json import load_json
+from utils.similarity import MinHashLSH, tokenize
+
+
+# Index of every task and query researched under model_output_data/, so new
+# tasks can be matched against past runs and reuse their results
+class TaskMemory:
+
+    def __init__(self, base_path, max_age=None):
+        self.base_path = base_path
+        self.max_age = max_age
+        self.index = MinHashLSH()
+        self.folder_state = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        # Re-indexes only folders whose tasks.json changed since the last scan
+        if not os.path.isdir(self.base_path):
+            return
+
+        with self._lock:
+            seen = set()
+
+            for folder in os.listdir(self.base_path):
+                tasks_path = os.path.join(self.base_path, folder, "tasks.json")
+                if not os.path.exists(tasks_path):
+                    continue
+
+                seen.add(folder)
+                mtime = os.path.getmtime(tasks_path)
+                state = self.folder_state.get(folder)
+                if state and state["mtime"] == mtime:
+                    continue
+
+                self._drop_folder(folder)
+                tasks = load_json(tasks_path, [])
+                descriptions = [
+                    task["description"] for task in tasks
+                    if isinstance(task, dict) and task.get("description")
+                ]
+
+                self.index.add(("query", folder), tokenize(folder.replace("_", " ")))
+                for description in descriptions:
+                    self.index.add(("task", folder, description), tokenize(description))
+
+                self.folder_state[folder] = {"mtime": mtime, "descriptions": descriptions}
+
+            for folder in set(self.folder_state) - seen:
+                self._drop_folder(folder)
+
+    def _drop_folder(self, folder):
+        state = self.folder_state.pop(folder, None)
+        if state is None:
+            return
+
+        self.index.remove(("query", folder))
+        for description in state["descriptions"]:
+            self.index.remove(("task", folder, description))
+
+    def _is_fresh(self, folder):
+        if self.max_age is None:
+            return True
+        synthesis_path = os.path.join(self.base_path, folder, "synthesis_results.json")
+        return os.path.exists(synthesis_path) and time.time() - os.path.getmtime(synthesis_path) <= self.max_age
+
+    def find_tasks(self, description, threshold, exclude_folder=None):
+        # Returns (score, folder, matched description) for past tasks, best first
+        matches = self.index.query(
+            tokenize(description),
+            threshold,
+            key_filter=lambda key: key[0] == "task" and key[1] != exclude_folder
+        )
+        return [(score, key[1], key[2]) for score, key in matches if self._is_fresh(key[1])]
+
+    def find_query(self, query, threshold, exclude_folder=None):
+        matches = self.index.query(
+            tokenize(query),
+            threshold,
+            key_filter=lambda key: key[0] == "query" and key[1] != exclude_folder
+        )
+        return [(score, key[1]) for score, key in matches]
+
+    def folder_tasks(self, folder):
+        state = self.folder_state.get(folder)
+        return list(state["descriptions"]) if state else []
@@ -0,0 +1,136 @@
+import time
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from utils.metrics import SPAN_DURATION
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, name, kind, parent=None, **attrs):
+        span = {
+            "id": next(self._ids),
+            "parent": parent,
+            "name": name,
+            "kind": kind,
+            "start": time.perf_counter() - self._origin,
+            "duration": None,
+            "attrs": attrs,
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def finish(self, span):
+        span["duration"] = time.perf_counter() - self._origin - span["start"]
+        SPAN_DURATION.observe(span["duration"], kind=span["kind"], name=span["name"])
+
+    def tokens_used(self):
+        with self._lock:
+            spans = list(self.spans)
+        return sum(
+            span["attrs"].get("prompt_tokens", 0) + span["attrs"].get("completion_tokens", 0)
+            for span in spans
+        )
+
+    def summary(self):
+        # Total time and call counts per span name, slowest first
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(f"{span['kind']}:{span['name']}", {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += span["duration"] or 0.0
+            for key in ("prompt_tokens", "completion_tokens", "retries"):
+                if key in span["attrs"]:
+                    entry[key] = entry.get(key, 0) + span["attrs"][key]
+            if "cached" in span["attrs"]:
+                entry["cache_hits"] = entry.get("cache_hits", 0) + bool(span["attrs"]["cached"])
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["seconds"]))
+
+    def to_dict(self):
+        with self._lock:
+            spans = [dict(span) for span in self.spans]
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "duration": time.perf_counter() - self._origin,
+            "summary": self.summary(),
+            "spans": spans,
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, kind="call", **attrs):
+    # Yields the span's attribute dict so callers can annotate it (tokens, cache hits, ...).
+    # Without an active trace only the duration metric is recorded.
+    trace = _current_trace.get()
+    parent = _current_span.get()
+
+    if trace is None:
+        record = {"name": name, "kind": kind, "attrs": attrs}
+        started = time.perf_counter()
+    else:
+        record = trace.start(name, kind, parent=parent["id"] if parent else None, **attrs)
+
+    token = _current_span.set(record)
+    try:
+        yield record["attrs"]
+    except Exception as e:
+        record["attrs"]["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        if trace is None:
+            SPAN_DURATION.observe(time.perf_counter() - started, kind=kind, name=name)
+        else:
+            trace.finish(record)
+
+
+def annotate(**attrs):
+    record = _current_span.get()
+    if record is not None:
+        record["attrs"].update(attrs)
+
+
+def increment(key, amount=1):
+    record = _current_span.get()
+    if record is not None:
+        record["attrs"][key] = record["attrs"].get(key, 0) + amount
+
+
+@contextmanager
+def trace_run(run_id=None, **attrs):
+    trace = Trace(run_id)
+    token = _current_trace.set(trace)
+    try:
+        with span("run", kind="run", run_id=run_id, **attrs):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def in_context(fn):
+    # Worker threads do not inherit context variables; wrap each submitted call so its
+    # spans attach to the submitting thread's trace
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)